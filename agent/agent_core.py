@@ -1,12 +1,19 @@
 # agent/agent_core.py
 
-from typing import Dict, List
-from agent.agent_init import init_agent, get_summarizer
+import asyncio
+import os
+import time
+from contextlib import aclosing
+from typing import Any, Dict, List, Tuple
+from agent.agent_init import init_agent, get_summarizer, get_agent_engine
 from agent.memory_manager import memory
 from agent.singleton_plan import plan_manager_instance as plan_manager
 from agent.context import global_state
-from agent.utils import load_input_json
-from agent.tools import get_toolkit
+from agent.utils import load_input_json, compact_logs, format_log_spans
+from agent.tools import get_toolkit, is_read_only
+from agent.decision_cache import DecisionCache
+from agent.run_budget import RunBudget, BudgetCounters
+from agent.tool_memo import tool_run_scope
 
 
 class PetCareAgent:
@@ -14,7 +21,9 @@ class PetCareAgent:
         """
         初始化 PetCareAgent，內部自動 init_agent()
         """
-        self.agent = init_agent()
+        # AGENT_ENGINE：react（文字 ReAct）或 tool_calling（原生 function calling）
+        self.engine = get_agent_engine()
+        self.agent = init_agent(self.engine)
         self.memory = memory
         self.summary_memory = memory.summary_memory
         self.plan_manager = plan_manager
@@ -23,24 +32,37 @@ class PetCareAgent:
         self.current_time = None
         self.last_summary_text = ""
         self.summarizer = get_summarizer()
+        # 相同 (行為, 地點, 狀態, 計畫版本) 的 observation 重用先前的決策
+        self.decision_cache = DecisionCache()
+        # 一般狀態下，符合日常基準的 observation 直接記錄，不進入 ReAct 流程
+        self.triage_enabled = os.getenv("BASELINE_TRIAGE", "1") == "1"
+        # 各項執行預算（輪數、工具呼叫、時間）用完的次數
+        self.budget_counters = BudgetCounters()
 
     async def run_with_log_window(self, log_list: List[Dict], current_time: str) -> Dict:
         """
         從五分鐘 log 中摘要記憶，選定 current_time 起始 observation，依序推理。
         """
 
-        # 1. 記憶摘要寫入
-        summary_list = [f"時間：{log['time']}，行為：{log['action']}，地點：{log.get('地點', '未知')}" for log in log_list]
-        raw_summary = "\n".join(summary_list)
+        # 1. 記憶摘要寫入：連續相同的 (行為, 地點) 先合併成區段，減少 prompt 長度
+        spans = compact_logs(log_list)
 
-        # 使用 LLM 摘要摘要文字
-        summary_prompt = (
-            "請你根據以下過去五分鐘的觀察紀錄，產生一句話摘要描述，描述狗狗的主要活動與整體狀態：\n"
-            f"{raw_summary}"
-        )
+        if all(self.memory.is_behavior_excluded(span["action"]) for span in spans):
+            # 整個視窗都是已排除的非異常行為，不需要呼叫 LLM 摘要
+            summary_text = "過去五分鐘皆為非異常行為：" + "、".join(
+                f"{span['action']}（{span['地點']}，{span['count']} 筆）" for span in spans
+            )
+        else:
+            raw_summary = format_log_spans(spans)
 
-        response = await self.summarizer.ainvoke(summary_prompt) #非同步呼叫，回傳 coroutine（可以 await）
-        summary_text = response.content.strip() if isinstance(response, str) else str(response)
+            # 使用 LLM 摘要摘要文字
+            summary_prompt = (
+                "請你根據以下過去五分鐘的觀察紀錄，產生一句話摘要描述，描述狗狗的主要活動與整體狀態：\n"
+                f"{raw_summary}"
+            )
+
+            response = await self.summarizer.ainvoke(summary_prompt) #非同步呼叫，回傳 coroutine（可以 await）
+            summary_text = response.content.strip() if isinstance(response, str) else str(response)
 
         self.last_summary_text = summary_text.strip()
         self.summary_memory.add_user_message(self.last_summary_text)
@@ -51,6 +73,8 @@ class PetCareAgent:
         if not start_obs:
             return {"error": f"找不到 {current_time} 的 observation"}
 
+        # 相關記憶只針對起始 observation 查詢，且在 run() 通過排除、基準分流與決策快取檢查後才查詢
+        # （每筆 log 的字串都含不同時間，預先查詢整個視窗無法被快取重用）
         return await  self.run(start_obs)
 
     async def run(self, input_json: Dict) -> Dict:
@@ -62,46 +86,83 @@ class PetCareAgent:
         # 檢查是否為非異常行為
         behavior = observation.get("action")
 
-        if self.memory.is_behavior_excluded(behavior):
-            response = f"行為「{behavior}」已標記為非異常，無需處理。"
-            self.summary_memory.add_user_message(str(observation))
-            self.summary_memory.add_ai_message(response)
-            self.memory.record_event(observation, action="略過（非異常行為）", effectiveness="無需處理")
-            self.summary_memory.get_summary()
-            return {
-                "input": input_json,
-                "agent_response": response
-            }
+        exclusion = self.memory.explain_exclusion(behavior)
+        if exclusion is not None:
+            if exclusion["rule"] == behavior:
+                response = f"行為「{behavior}」已標記為非異常，無需處理。"
+            else:
+                response = f"行為「{behavior}」符合非異常規則「{exclusion['rule']}」，無需處理。"
+            return self._skip(input_json, response, action="略過（非異常行為）")
 
-        completed = False
-        full_steps = []
+        state = self.memory.get_current_state()
+        # 曾被記錄為異常的行為一律交給 Agent，不經統計分流
+        if self.triage_enabled and state == "一般" and not self.memory.is_behavior_abnormal(behavior):
+            verdict = self.memory.baseline.score(observation)
+            if not verdict["unusual"]:
+                response = (f"行為「{behavior}」符合日常基準（此時段出現機率 {verdict['probability']:.3f}），"
+                            f"無需處理。")
+                return self._skip(input_json, response, action="略過（符合日常基準）")
 
-        while not completed:
-            related_memory = self.memory.search_similar_memory(str(observation))
+        # 本次執行內共用的工具結果快取：重複的查詢直接重用，有副作用的工具會使快取失效
+        with tool_run_scope():
+            cached = self.decision_cache.get(observation, state, self.plan_manager.version)
+            exhausted = False
+            if cached is not None:
+                # 相同情境已推理過：不呼叫 LLM 也不執行任何工具，直接沿用當時的回應；
+                # 事件只記錄沿用快取，不把當時的行動（餵食、通知等）記成這次有執行
+                tool_calls = cached["tool_calls"]
+                final_output = cached["final_output"]
+                skipped = self._side_effect_tools(tool_calls)
+                actions_taken = "沿用快取決策"
+                if skipped:
+                    actions_taken += f"（先前的行動未重複執行：{'、'.join(skipped)}）"
+            else:
+                start = time.perf_counter()
+                completed = False
+                full_steps = []
+                budget = RunBudget()
 
-            prompt_input = {
-                "input": f"觀察: {observation}\n相關記憶: {related_memory}",
-                "tools": "\n".join([f"- {tool.__name__}: {tool.__doc__}" for tool in get_toolkit()])
-            }
+                while not completed and budget.start_iteration():
+                    steps = []
+                    try:
+                        # 時間預算涵蓋整輪推理（含相關記憶查詢），不只 Agent 串流
+                        await asyncio.wait_for(self._run_iteration(observation, budget, steps),
+                                               timeout=budget.remaining())
+                    except asyncio.TimeoutError:
+                        budget.expire()
+                    full_steps.extend(steps)
+                    if budget.exhausted:
+                        break
 
-            steps = list(self.agent.stream(prompt_input))
-            full_steps.extend(steps)
+                    # 檢查是否完成
+                    for block in steps:
+                        if 'output' in block:
+                            output_text = block['output']
+                            if "完成" in output_text or "無需進一步行動" in output_text:
+                                completed = True
+                                break
 
-            # 檢查是否完成
-            for block in steps:
-                if 'output' in block:
-                    output_text = block['output']
-                    if "完成" in output_text or "無需進一步行動" in output_text:
-                        completed = True
-                        break
+                    if not completed:
+                        # 如果還沒完成，模擬新的 observation
+                        observation = self._simulate_new_observation(steps)
 
-            if not completed:
-                # 如果還沒完成，模擬新的 observation
-                observation = self._simulate_new_observation(steps)
+                self.budget_counters.record(budget)
 
-        # 最後一次 memory更新
-        final_output = self._extract_final_output_from_steps(full_steps)
-        actions_taken = self._extract_actions_from_steps(full_steps)
+                # 最後一次 memory更新
+                tool_calls = self._extract_tool_calls(full_steps)
+                actions_taken = self._extract_actions_from_steps(full_steps)
+                exhausted = budget.exhausted is not None
+                if budget.exhausted:
+                    # 預算用完：不再等待 LLM，改用預設回應，結果也不寫入決策快取
+                    print(f"[Agent] 執行預算用完（{budget.exhausted}），改用預設回應")
+                    final_output = (f"本次推理已達上限（{budget.exhausted}），已記錄觀察並維持目前計畫，"
+                                    f"暫不採取進一步行動。")
+                else:
+                    final_output = self._extract_final_output_from_steps(full_steps)
+                    self.decision_cache.put(
+                        input_json, self.memory.get_current_state(), self.plan_manager.version,
+                        tool_calls, actions_taken, final_output, time.perf_counter() - start
+                    )
 
         ai_summary = (
             f"本次觸發行為：{observation.get('action')}（地點：{observation.get('地點')}）\n"
@@ -111,14 +172,74 @@ class PetCareAgent:
 
         self.summary_memory.add_user_message(str(observation))
         self.summary_memory.add_ai_message(ai_summary)
-        self.memory.record_event(observation, actions_taken, effectiveness="待觀察")
-        self.summary_memory.get_summary()
+        # 只有 Agent 完整推理且沒有採取任何行動（只用查詢型工具）時，才視為正常並納入日常基準
+        normal = (not exhausted and not self._took_action(tool_calls)
+                  and not self.memory.is_behavior_abnormal(input_json.get("action")))
+        self.memory.record_event(observation, actions_taken, effectiveness="待觀察", normal=normal)
+        self.memory.summary_worker.request()
 
         return {
             "input": input_json,
             "agent_response": final_output
         }
 
+    async def _run_iteration(self, observation: Dict, budget: RunBudget, steps: List[Dict]):
+        """
+        執行一輪推理：查詢相關記憶後執行 Agent，將串流的步驟加入 steps。
+        工具呼叫次數超過預算時，在工具執行前關閉串流，該次未執行的工具呼叫不加入 steps；
+        逾時取消時也會關閉串流。
+        """
+        related_memory = await self.memory.asearch_similar_memory(str(observation))
+
+        prompt_input = {
+            "input": f"觀察: {observation}\n相關記憶: {related_memory}",
+            "tools": "\n".join([f"- {tool.__name__}: {tool.__doc__}" for tool in get_toolkit()])
+        }
+
+        async with aclosing(self.agent.astream(prompt_input)) as stream:
+            async for step in stream:
+                if 'actions' in step and not budget.allow_tool_calls(len(step['actions'])):
+                    return
+                steps.append(step)
+
+    def _skip(self, observation: Dict, response: str, action: str) -> Dict:
+        """
+        不經過 LLM 直接記錄 observation（非異常行為或符合日常基準）。
+        """
+        self.summary_memory.add_user_message(str(observation))
+        self.summary_memory.add_ai_message(response)
+        self.memory.record_event(observation, action=action, effectiveness="無需處理", normal=True)
+        self.memory.summary_worker.request()
+        return {
+            "input": observation,
+            "agent_response": response
+        }
+
+    def _extract_tool_calls(self, steps) -> List[Tuple[str, Any]]:
+        """
+        取出實際執行過的工具與輸入（依執行順序）。
+        """
+        calls = []
+        for block in steps:
+            for s in block.get('steps', []):
+                if hasattr(s, "action") and s.action is not None:
+                    calls.append((s.action.tool, s.action.tool_input))
+        return calls
+
+    def _took_action(self, tool_calls: List[Tuple[str, Any]]) -> bool:
+        """
+        是否執行過有副作用的工具（無法辨識的工具名稱也視為有行動）。
+        """
+        tools = {tool.__name__: tool for tool in get_toolkit()}
+        return any(name not in tools or not is_read_only(tools[name]) for name, _ in tool_calls)
+
+    def _side_effect_tools(self, tool_calls: List[Tuple[str, Any]]) -> List[str]:
+        """
+        回傳工具序列中有副作用的工具名稱（不重複，依出現順序）。
+        """
+        tools = {tool.__name__: tool for tool in get_toolkit()}
+        return list(dict.fromkeys(name for name, _ in tool_calls if name in tools and not is_read_only(tools[name])))
+
     def _extract_final_output_from_steps(self, steps) -> str:
         for block in reversed(steps):
             if 'output' in block:
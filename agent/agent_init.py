@@ -1,42 +1,115 @@
 # agent/agent_init.py
 
 import os
-from langchain.agents import Tool, AgentExecutor, create_react_agent
-from langchain_core.prompts import ChatPromptTemplate
+from langchain.agents import Tool, AgentExecutor, create_react_agent, create_tool_calling_agent
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.tools import StructuredTool
 from langchain_openai import ChatOpenAI
+# 原生 tool calling 需要 langchain_openai 版本的 ChatOpenAI（下方舊版 import 不支援 bind_tools）
+from langchain_openai import ChatOpenAI as ToolCallingChatOpenAI
 from dotenv import load_dotenv, find_dotenv
 from pathlib import Path
-from agent.tools import get_toolkit
+from agent.tools import get_toolkit, get_async_tool, is_read_only
 from langchain.chat_models import ChatOpenAI
+from agent.lazy import LazyProxy
 
 load_dotenv(Path("..\\.env"))
 load_dotenv(find_dotenv())
 chat_key = os.getenv("OPENAI_CHAT_KEY")
-summarizer = ChatOpenAI(temperature=0, model_name="gpt-4o-mini", api_key=chat_key)
+summarizer = LazyProxy(
+    "summarizer", lambda: ChatOpenAI(temperature=0, model_name="gpt-4o-mini", api_key=chat_key)
+)
 
 def get_summarizer():
-    return summarizer
+    return summarizer.get()
 
-def init_agent():
+AGENT_ENGINES = ("react", "tool_calling")
+
+
+def get_agent_engine(engine: str = None) -> str:
+    engine = (engine or os.getenv("AGENT_ENGINE", "react")).lower()
+    if engine not in AGENT_ENGINES:
+        raise ValueError(f"未知的 AGENT_ENGINE：{engine}")
+    return engine
+
+
+def init_agent(engine: str = None):
     """
     初始化新的 GOAP 思考流程 LLM Agent（內部自己抓工具）
+
+    Args:
+        engine (str): react（文字 Thought/Action 格式）或 tool_calling（模型原生 function calling），
+                      預設讀取 AGENT_ENGINE
     """
     chat_model = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
-
-    llm = ChatOpenAI(
-        model=chat_model,
-        temperature=0,
-        api_key=chat_key
-    )
+    engine = get_agent_engine(engine)
 
     # 自己抓工具，不需要外部傳入
     tools = get_toolkit()
 
+    if engine == "tool_calling":
+        llm = ToolCallingChatOpenAI(model=chat_model, temperature=0, api_key=chat_key)
+        agent, langchain_tools = _build_tool_calling_agent(llm, tools)
+    else:
+        llm = ChatOpenAI(model=chat_model, temperature=0, api_key=chat_key)
+        agent, langchain_tools = _build_react_agent(llm, tools)
+
+    # 單輪推理的步數與時間上限，外層的執行預算見 agent/run_budget.py
+    agent_executor = AgentExecutor(
+        agent=agent,
+        tools=langchain_tools,
+        verbose=True,
+        handle_parsing_errors=True,
+        max_iterations=int(os.getenv("AGENT_MAX_TOOL_CALLS", 12)),
+        max_execution_time=float(os.getenv("AGENT_RUN_TIMEOUT", 60)),
+        early_stopping_method="force"
+    )
+
+    return agent_executor
+
+
+def _build_tool_calling_agent(llm, tools):
+    """
+    以模型原生的 tool calling 建立 Agent：工具的 JSON schema 由函式簽名產生，
+    模型直接回傳結構化的工具呼叫，不需要解析文字；同一輪的多個工具呼叫會並行執行。
+    """
+    langchain_tools = [
+        StructuredTool.from_function(
+            func=tool,
+            coroutine=get_async_tool(tool),
+            name=tool.__name__,
+            description=tool.__doc__ or "無描述",
+            metadata={"read_only": is_read_only(tool)}
+        )
+        for tool in tools
+    ]
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system",
+         """你是一個寵物照護 AI Agent，依 GOAP 流程處理當前觀察（Observation）：
+1. 感知：理解狗狗目前的行為、地點與時間。除非有新的 Observation，否則環境狀態不會改變。
+2. 目標決策：判斷是否需要新增 Current Plan；新增前先用 check_daily_plan_conflict 確認是否衝突，衝突則改時間或放棄。
+3. 規劃與執行：只呼叫必要的工具；彼此獨立的查詢請在同一輪一次呼叫。
+4. 觀察與調整：根據工具結果判斷是否還需要行動。
+
+沒有新的明確行動、或所有必要行動已完成時，直接回覆最終結果，並以「本次照護流程完成。」結尾。
+遇到無法處理的情境也要直接回覆；同一個動作（例如通知、新增計畫）不要重複執行。"""),
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ])
+
+    agent = create_tool_calling_agent(llm=llm, tools=langchain_tools, prompt=prompt)
+    return agent, langchain_tools
+
+
+def _build_react_agent(llm, tools):
     langchain_tools = [
         Tool(
             name=tool.__name__,
             func=tool,
-            description=tool.__doc__ or "無描述"
+            coroutine=get_async_tool(tool),
+            description=tool.__doc__ or "無描述",
+            metadata={"read_only": is_read_only(tool)}
         )
         for tool in tools
     ]
@@ -61,9 +134,6 @@ def init_agent():
    - 依序執行行動。
    - 每次 Action 後假設 Observation 暫時未更新，請自行判斷是否需要繼續行動。
 5. 觀察與調整 (Observe & Adjust)：每步驟後重新觀察環境，必要時調整計畫。
-   - 不得重複使用 wait_and_observe 超過一次，若無變化請立即輸出 Final Answer。
-   - 不得重複使用 get_today_plan 超過一次，若無變化請立即輸出 Final Answer。
-   - 不得無限重複工具呼叫
    - Final Answer 一出，代表本次照護流程結束。
 
 ---
@@ -86,7 +156,7 @@ Thought: 分析行動後的結果的情境與是否有需要的行動（如果
 Final Answer: 本次照護流程完成。
 ---
 注意事項：
-- 不要持續重複同一個行動（例如 'check_temp', 'notify_owner', 'get_today_plan', 'add_plan_item' 等）若重複執行則視為違反規則，立即輸出 Final Answer，結束本次流程。
+- 不要重複執行相同的動作（例如 'notify_owner', 'add_plan_item' 等），動作完成後請立即輸出 Final Answer，結束本次流程。
 - 查詢型工具（如 'get_today_plan', 'check_temp' 等）使用後，請立即判斷是否需要進一步行動，不用則立即輸出 Final Answer，結束本次流程。
 - 若無新的明確行動，請立即輸出 Final Answer，結束本次流程。
 - 如確定無需再執行新的行動，請儘速輸出 Final Answer。
@@ -99,9 +169,7 @@ Thought:{agent_scratchpad}
 """
     )
 
-    agent = create_react_agent(llm=llm, tools=langchain_tools, prompt=prompt)
     # 建立 ReAct Agent
-    agent_executor = AgentExecutor(agent=agent, tools=langchain_tools, verbose=True, handle_parsing_errors=True)
-
-    return agent_executor
+    agent = create_react_agent(llm=llm, tools=langchain_tools, prompt=prompt)
+    return agent, langchain_tools
 
@@ -0,0 +1,158 @@
+# agent/ann_index.py
+
+import math
+import os
+from typing import Dict, Iterable, List, Optional
+
+import faiss  # faiss_cpu
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+
+
+def load_index_config() -> Dict:
+    """
+    從環境變數讀取向量索引設定。
+
+    VECTOR_INDEX_TYPE 可為 flat / hnsw / ivf / auto；auto 代表資料量未達
+    VECTOR_ANN_THRESHOLD 前使用 flat，超過後於背景改建為 VECTOR_ANN_TYPE。
+    """
+    return {
+        "index_type": os.getenv("VECTOR_INDEX_TYPE", "auto").lower(),
+        "ann_type": os.getenv("VECTOR_ANN_TYPE", "hnsw").lower(),
+        "threshold": int(os.getenv("VECTOR_ANN_THRESHOLD", 10000)),
+        "hnsw_m": int(os.getenv("VECTOR_HNSW_M", 32)),
+        "ef_construction": int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", 80)),
+        "ef_search": int(os.getenv("VECTOR_HNSW_EF_SEARCH", 64)),
+        "nlist": int(os.getenv("VECTOR_IVF_NLIST", 0)),  # 0 表示依資料量自動決定
+        "nprobe": int(os.getenv("VECTOR_IVF_NPROBE", 8)),
+        # HNSW 刪除只留下墓碑，墓碑超過此比例時於背景重建索引
+        "compact_ratio": float(os.getenv("VECTOR_COMPACT_RATIO", 0.2)),
+    }
+
+
+def index_type_of(index) -> str:
+    """
+    判斷 FAISS 索引的種類。
+    """
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def default_nlist(n: int) -> int:
+    # 常見經驗值：約 4 * sqrt(n) 個分群，且每群至少有 39 筆訓練資料
+    return max(1, min(int(4 * math.sqrt(max(n, 1))), n // 39 or 1))
+
+
+def min_train_size(index_type: str, config: Dict) -> int:
+    """
+    建立該類型索引所需的最少資料量。
+    """
+    if index_type == "ivf":
+        return max(config["nlist"], 1) * 39 if config["nlist"] else 39
+    return 0
+
+
+def build_index(index_type: str, dim: int, vectors: Optional[np.ndarray] = None,
+                config: Optional[Dict] = None):
+    """
+    建立指定類型的 FAISS 索引，需要訓練的索引會以 vectors 訓練後再加入（位置依序為 0..n-1）。
+    Args:
+        index_type (str): flat / hnsw / ivf
+        dim (int): 向量維度
+        vectors (Optional[np.ndarray]): 要加入的向量（float32, shape = (n, dim)）
+        config (Optional[Dict]): 索引參數，預設由環境變數讀取
+    Returns:
+        faiss.Index: 建立好的索引
+    """
+    config = config or load_index_config()
+    n = 0 if vectors is None else len(vectors)
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, config["hnsw_m"])
+        index.hnsw.efConstruction = config["ef_construction"]
+    elif index_type == "ivf":
+        if n == 0:
+            raise ValueError("IVF 索引需要訓練資料")
+        nlist = config["nlist"] or default_nlist(n)
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_L2)
+        index.train(vectors)
+        ensure_id_lookup(index)
+    else:
+        raise ValueError(f"未知的索引類型：{index_type}")
+
+    apply_search_params(index, config)
+    if n:
+        add_vectors(index, vectors, 0)
+    return index
+
+
+def ensure_id_lookup(index) -> None:
+    """
+    IVF 索引改用 hashtable 的 direct map：可依 id reconstruct，也可 remove_ids / add_with_ids，
+    刪除後其餘向量的 id（即 docstore 的位置）維持不變。
+    """
+    if index_type_of(index) == "ivf" and index.direct_map.type != faiss.DirectMap.Hashtable:
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def apply_search_params(index, config: Optional[Dict] = None) -> None:
+    """
+    套用查詢參數（HNSW efSearch / IVF nprobe）。
+    """
+    config = config or load_index_config()
+    kind = index_type_of(index)
+    if kind == "hnsw":
+        index.hnsw.efSearch = config["ef_search"]
+    elif kind == "ivf":
+        index.nprobe = config["nprobe"]
+
+
+def add_vectors(index, vectors: np.ndarray, start: int) -> None:
+    """
+    將向量加入索引，位置（id）依序為 start, start + 1, ...
+    IVF 刪除後 ntotal 會變少，必須明確指定 id；flat / HNSW 的位置即為加入順序。
+    """
+    if index_type_of(index) == "ivf":
+        index.add_with_ids(vectors, np.arange(start, start + len(vectors), dtype="int64"))
+    else:
+        index.add(vectors)
+
+
+def get_vectors(index, positions: List[int]) -> np.ndarray:
+    """
+    取回索引中指定位置（id）的原始向量。
+    """
+    if not positions:
+        return np.zeros((0, index.d), dtype="float32")
+    ensure_id_lookup(index)
+    return index.reconstruct_batch(np.asarray(positions, dtype="int64"))
+
+
+def removes_in_place(index) -> bool:
+    """
+    刪除時是否直接從索引移除向量（flat 會重新編號位置，IVF 依 id 移除、位置不變）。
+    HNSW 不支援 remove_ids，改以墓碑標記並在查詢時過濾。
+    """
+    return index_type_of(index) != "hnsw"
+
+
+def search_params(index, tombstones: Iterable[int]):
+    """
+    建立排除墓碑位置的查詢參數，沒有墓碑（或索引不需要）時回傳 None。
+    """
+    tombstones = np.fromiter(tombstones, dtype="int64")
+    if index_type_of(index) != "hnsw" or len(tombstones) == 0:
+        return None
+    batch = faiss.IDSelectorBatch(tombstones)
+    selector = faiss.IDSelectorNot(batch)
+    params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    # SWIG 物件不會保留參照，避免選擇器被回收
+    params.referenced_objects = [batch, selector, tombstones]
+    return params
@@ -0,0 +1,274 @@
+# agent/behavior_baseline.py
+
+import json
+import math
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+TIME_FORMAT = "%Y%m%d%H%M%S"
+
+
+class BehaviorBaseline:
+    """
+    寵物日常行為的統計基準，用來在呼叫 LLM 前先分流 observation。
+
+    - 頻率：counts[行為, 小時, 地點] 的次數矩陣，以前後各一小時平滑後估計
+      P(行為, 地點 | 小時)，機率過低或從未出現的組合視為異常
+    - 持續時間：連續相同 (行為, 地點) 的事件合併為一個區段，以 Welford 演算法累積
+      log(1 + 秒數) 的平均與變異數，目前區段持續時間的 z 分數過高視為異常
+    兩者皆隨事件逐筆更新，不需要重新掃描歷史事件；save() / load() 將陣列存成 .npz，
+    並記錄已涵蓋到哪一筆事件（last_event_id），啟動時只需重播之後的事件。
+    """
+
+    def __init__(self, min_events: Optional[int] = None, min_probability: Optional[float] = None,
+                 duration_z: Optional[float] = None, min_duration_samples: Optional[int] = None,
+                 span_gap_seconds: Optional[float] = None, min_hour_events: Optional[int] = None):
+        """
+        Args:
+            min_events (Optional[int]): 累積事件數少於此值時一律送給 Agent，預設讀取 BASELINE_MIN_EVENTS
+            min_probability (Optional[float]): 低於此機率視為異常，預設讀取 BASELINE_MIN_PROBABILITY
+            duration_z (Optional[float]): 持續時間 z 分數上限，預設讀取 BASELINE_DURATION_Z
+            min_duration_samples (Optional[int]): 區段樣本數達到此值才檢查持續時間，預設讀取 BASELINE_MIN_DURATION_SAMPLES
+            span_gap_seconds (Optional[float]): 相鄰事件間隔不超過此秒數才視為同一區段，預設讀取 BASELINE_SPAN_GAP_SECONDS
+            min_hour_events (Optional[int]): 該時段（前後一小時）事件數少於此值時送給 Agent，預設讀取 BASELINE_MIN_HOUR_EVENTS
+        """
+        self.min_events = min_events or int(os.getenv("BASELINE_MIN_EVENTS", 50))
+        self.min_probability = min_probability or float(os.getenv("BASELINE_MIN_PROBABILITY", 0.02))
+        self.duration_z = duration_z or float(os.getenv("BASELINE_DURATION_Z", 3.0))
+        self.min_duration_samples = min_duration_samples or int(os.getenv("BASELINE_MIN_DURATION_SAMPLES", 5))
+        self.min_hour_events = min_hour_events or int(os.getenv("BASELINE_MIN_HOUR_EVENTS", 10))
+        self.span_gap = timedelta(seconds=span_gap_seconds or float(os.getenv("BASELINE_SPAN_GAP_SECONDS", 600)))
+
+        self._lock = threading.Lock()
+        self._behaviors: Dict[str, int] = {}
+        self._places: Dict[str, int] = {}
+        self.counts = np.zeros((0, 24, 0), dtype=np.float64)     # [行為, 小時, 地點]
+        self.hour_totals = np.zeros(24, dtype=np.float64)
+        self.duration_n = np.zeros((0, 0), dtype=np.float64)     # [行為, 地點]
+        self.duration_mean = np.zeros((0, 0), dtype=np.float64)
+        self.duration_m2 = np.zeros((0, 0), dtype=np.float64)
+        self.total = 0
+        # 目前尚未結束的區段
+        self._span: Optional[Dict] = None
+
+        self.scored = 0
+        self.unusual = 0
+        self.reasons: Dict[str, int] = {}
+
+    def build(self, observations: Iterable[Dict]) -> None:
+        """
+        以歷史 observation（依時間順序）建立基準。
+        """
+        for observation in observations:
+            self.observe(observation)
+
+    def save(self, path: str, last_event_id: int) -> None:
+        """
+        將基準存成 .npz（先寫暫存檔再取代）。
+        Args:
+            path (str): 檔案路徑
+            last_event_id (int): 基準已涵蓋的最後一筆事件 ID
+        """
+        with self._lock:
+            span = self._span
+            meta = {
+                "total": self.total,
+                "last_event_id": last_event_id,
+                "span": None if span is None else {
+                    "key": list(span["key"]),
+                    "start": span["start"].strftime(TIME_FORMAT),
+                    "last": span["last"].strftime(TIME_FORMAT)
+                }
+            }
+            arrays = {
+                "counts": self.counts,
+                "hour_totals": self.hour_totals,
+                "duration_n": self.duration_n,
+                "duration_mean": self.duration_mean,
+                "duration_m2": self.duration_m2,
+                "behaviors": np.array(list(self._behaviors), dtype=str),
+                "places": np.array(list(self._places), dtype=str),
+                "meta": np.array(json.dumps(meta, ensure_ascii=False))
+            }
+            tmp_path = path + ".tmp.npz"
+            np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> int:
+        """
+        載入 save() 存下的基準。
+        Returns:
+            int: 基準已涵蓋的最後一筆事件 ID（檔案不存在或無法讀取時為 0，需要從頭重播）
+        """
+        if not os.path.exists(path):
+            return 0
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                arrays = {name: data[name] for name in
+                          ("counts", "hour_totals", "duration_n", "duration_mean", "duration_m2")}
+                behaviors = [str(b) for b in data["behaviors"]]
+                places = [str(p) for p in data["places"]]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[Baseline] 無法讀取 {path}，改為重播全部事件：{e}")
+            return 0
+
+        with self._lock:
+            self.counts = arrays["counts"]
+            self.hour_totals = arrays["hour_totals"]
+            self.duration_n = arrays["duration_n"]
+            self.duration_mean = arrays["duration_mean"]
+            self.duration_m2 = arrays["duration_m2"]
+            self._behaviors = {b: i for i, b in enumerate(behaviors)}
+            self._places = {p: i for i, p in enumerate(places)}
+            self.total = meta["total"]
+            span = meta["span"]
+            self._span = None if span is None else {
+                "key": tuple(span["key"]),
+                "start": datetime.strptime(span["start"], TIME_FORMAT),
+                "last": datetime.strptime(span["last"], TIME_FORMAT)
+            }
+        return meta["last_event_id"]
+
+    def observe(self, observation: Dict) -> None:
+        """
+        加入一筆 observation（事件的 trigger），更新次數矩陣與持續時間分佈。
+        """
+        parsed = self._parse(observation)
+        if parsed is None:
+            return  # 例如模擬 observation 沒有實際時間
+        behavior, place, t = parsed
+        with self._lock:
+            b, p = self._index(behavior, place)
+            self.counts[b, t.hour, p] += 1
+            self.hour_totals[t.hour] += 1
+            self.total += 1
+
+            span = self._span
+            if span and span["key"] == (b, p) and timedelta(0) <= t - span["last"] <= self.span_gap:
+                span["last"] = t
+                return
+            if span:
+                self._add_duration(span)
+            self._span = {"key": (b, p), "start": t, "last": t}
+
+    def score(self, observation: Dict) -> Dict:
+        """
+        評估 observation 是否偏離基準。
+        Returns:
+            Dict: unusual（是否需要交給 Agent）、reason、probability、duration_seconds、duration_z
+        """
+        result = {"unusual": True, "reason": None, "probability": None, "duration_seconds": None, "duration_z": None}
+        parsed = self._parse(observation)
+        with self._lock:
+            if parsed is None:
+                result["reason"] = "無法解析時間"
+            elif self.total < self.min_events:
+                result["reason"] = "基準資料不足"
+            else:
+                self._score_locked(*parsed, result)
+            self.scored += 1
+            if result["unusual"]:
+                self.unusual += 1
+                self.reasons[result["reason"]] = self.reasons.get(result["reason"], 0) + 1
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "events": self.total,
+                "behaviors": len(self._behaviors),
+                "places": len(self._places),
+                "duration_spans": int(self.duration_n.sum()),
+                "scored": self.scored,
+                "unusual": self.unusual,
+                "usual": self.scored - self.unusual,
+                "reasons": dict(self.reasons)
+            }
+
+    # ------------------- 內部方法 -------------------
+
+    def _score_locked(self, behavior: str, place: str, t: datetime, result: Dict):
+        b = self._behaviors.get(behavior)
+        p = self._places.get(place)
+        if b is None or p is None:
+            result["reason"] = "未曾出現的行為或地點"
+            return
+
+        # 前後各一小時一起計算，避免資料稀疏時整點邊界造成誤判
+        hours = [(t.hour + d) % 24 for d in (-1, 0, 1)]
+        hour_total = self.hour_totals[hours].sum()
+        if hour_total < self.min_hour_events:
+            result["reason"] = "此時段資料不足"
+            return
+        cells = len(self._behaviors) * len(self._places)
+        probability = (self.counts[b, hours, p].sum() + 1.0) / (hour_total + cells)
+        result["probability"] = round(float(probability), 6)
+        if probability < self.min_probability:
+            result["reason"] = "此時段少見的行為"
+            return
+
+        duration = self._ongoing_duration(b, p, t)
+        result["duration_seconds"] = duration
+        n = self.duration_n[b, p]
+        if n >= self.min_duration_samples:
+            std = max(math.sqrt(self.duration_m2[b, p] / (n - 1)), 0.1)
+            z = (math.log1p(duration) - self.duration_mean[b, p]) / std
+            result["duration_z"] = round(float(z), 3)
+            if z > self.duration_z:
+                result["reason"] = "持續時間過長"
+                return
+
+        result["unusual"] = False
+        result["reason"] = "符合日常基準"
+
+    def _ongoing_duration(self, b: int, p: int, t: datetime) -> float:
+        span = self._span
+        if span and span["key"] == (b, p) and timedelta(0) <= t - span["last"] <= self.span_gap:
+            return (t - span["start"]).total_seconds()
+        return 0.0
+
+    def _add_duration(self, span: Dict):
+        b, p = span["key"]
+        x = math.log1p((span["last"] - span["start"]).total_seconds())
+        self.duration_n[b, p] += 1
+        delta = x - self.duration_mean[b, p]
+        self.duration_mean[b, p] += delta / self.duration_n[b, p]
+        self.duration_m2[b, p] += delta * (x - self.duration_mean[b, p])
+
+    def _index(self, behavior: str, place: str) -> Tuple[int, int]:
+        if behavior not in self._behaviors:
+            self._behaviors[behavior] = len(self._behaviors)
+        if place not in self._places:
+            self._places[place] = len(self._places)
+        b, p = self._behaviors[behavior], self._places[place]
+        if b >= self.counts.shape[0] or p >= self.counts.shape[2]:
+            self._grow(len(self._behaviors), len(self._places))
+        return b, p
+
+    def _grow(self, n_behaviors: int, n_places: int):
+        # 以倍數擴充，避免每出現一個新行為就複製整個陣列
+        rows, cols = self.counts.shape[0], self.counts.shape[2]
+        if n_behaviors > rows:
+            rows = max(n_behaviors, rows * 2, 8)
+        if n_places > cols:
+            cols = max(n_places, cols * 2, 4)
+        extra_b, extra_p = rows - self.counts.shape[0], cols - self.counts.shape[2]
+        self.counts = np.pad(self.counts, ((0, extra_b), (0, 0), (0, extra_p)))
+        self.duration_n = np.pad(self.duration_n, ((0, extra_b), (0, extra_p)))
+        self.duration_mean = np.pad(self.duration_mean, ((0, extra_b), (0, extra_p)))
+        self.duration_m2 = np.pad(self.duration_m2, ((0, extra_b), (0, extra_p)))
+
+    @staticmethod
+    def _parse(observation: Dict) -> Optional[Tuple[str, str, datetime]]:
+        try:
+            t = datetime.strptime(str(observation.get("time")), TIME_FORMAT)
+        except ValueError:
+            return None
+        behavior = " ".join(str(observation.get("action", "")).split())
+        place = " ".join(str(observation.get("地點", "未知")).split())
+        return behavior, place, t
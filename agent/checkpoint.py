@@ -0,0 +1,104 @@
+# agent/checkpoint.py
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+
+def observation_id(log: Dict) -> str:
+    """
+    以 observation 的完整內容（鍵排序後的 JSON）計算穩定的 ID，重新啟動或重讀 log 都會得到相同結果。
+    """
+    raw = json.dumps(log, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class CheckpointStore:
+    """
+    以 SQLite 持久化已處理的 observation ID 與排程水位，重新啟動後可從中斷處繼續，
+    已處理過的 observation 不會再送給 Agent。
+    """
+
+    def __init__(self, db_path: str = "../memory/checkpoint.db"):
+        """
+        Args:
+            db_path (str): SQLite 資料庫路徑（預設與記憶資料放在同一個資料夾）
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS processed (id TEXT PRIMARY KEY, time TEXT, processed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_processed_time ON processed(time)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT)")
+        atexit.register(self.close)
+
+    def filter_unprocessed(self, logs: List[Dict]) -> List[Dict]:
+        """
+        回傳尚未處理過的 observation（保留原順序，同一批內重複的也只保留一筆）。
+        """
+        ids = [observation_id(log) for log in logs]
+        done = self._existing(ids)
+        result = []
+        for obs_id, log in zip(ids, logs):
+            if obs_id not in done:
+                done.add(obs_id)
+                result.append(log)
+        return result
+
+    def mark_processed(self, logs: Iterable[Dict]) -> None:
+        now = time.time()
+        rows = [(observation_id(log), log.get("time"), now) for log in logs]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("INSERT OR IGNORE INTO processed (id, time, processed_at) VALUES (?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def prune(self, until_time: str) -> None:
+        """
+        刪除 time <= until_time 的處理紀錄（排程不會再回到這些時間）。
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM processed WHERE time <= ?", (until_time,))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+        return {"processed_tracked": count, "resume_from": self.get("resume_from")}
+
+    def close(self):
+        with self._lock:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+
+    # ------------------- 內部方法 -------------------
+
+    def _existing(self, ids: List[str]) -> set:
+        found = set()
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT id FROM processed WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(r[0] for r in rows)
+        return found
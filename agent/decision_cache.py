@@ -0,0 +1,103 @@
+# agent/decision_cache.py
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class DecisionCache:
+    """
+    快取 Agent 對相同 observation 的決策（執行過的工具序列與最終回應）。
+
+    快取鍵為正規化後的 (行為, 地點)，並記錄建立時的寵物狀態與計畫版本；
+    狀態或計畫變動時整個快取失效，項目超過 TTL 也不再使用。
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            ttl (Optional[float]): 快取有效秒數，預設讀取 DECISION_CACHE_TTL
+            max_entries (Optional[int]): 最多保留的項目數，預設讀取 DECISION_CACHE_SIZE
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("DECISION_CACHE_TTL", 600))
+        self.max_entries = max_entries or int(os.getenv("DECISION_CACHE_SIZE", 256))
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._context: Optional[Tuple[str, int]] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidations = 0
+        self.miss_seconds = 0.0  # 未命中時完整推理所花的時間，用於估算節省的時間
+
+    @staticmethod
+    def key_for(observation: Dict) -> Tuple[str, str]:
+        action = " ".join(str(observation.get("action", "")).split())
+        place = " ".join(str(observation.get("地點", "")).split())
+        return action, place
+
+    def get(self, observation: Dict, state: str, plan_version: int) -> Optional[Dict]:
+        """
+        取得快取的決策，狀態或計畫版本與快取建立時不同則先清空快取。
+        """
+        self._check_context(state, plan_version)
+        key = self.key_for(observation)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry["created_at"] > self.ttl:
+            del self._entries[key]
+            self.expired += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, observation: Dict, state: str, plan_version: int, tool_calls: List[Tuple[str, Any]],
+            actions_taken: str, final_output: str, elapsed: float = 0.0) -> None:
+        """
+        記錄一次完整推理的結果（state、plan_version 為推理結束時的值）。
+        推理過程中若狀態或計畫已變動（例如 Agent 自己新增了計畫），結果只適用於舊的情境，
+        不寫入快取並清空既有項目。
+        """
+        self.miss_seconds += elapsed
+        if self._context != (state, plan_version):
+            self.invalidate()
+            return
+        self._entries[self.key_for(observation)] = {
+            "tool_calls": list(tool_calls),
+            "actions_taken": actions_taken,
+            "final_output": final_output,
+            "created_at": time.monotonic()
+        }
+        self._entries.move_to_end(self.key_for(observation))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "expired": self.expired,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl,
+            "estimated_saved_seconds": round(self.hits * avg_miss, 2)
+        }
+
+    def _check_context(self, state: str, plan_version: int):
+        context = (state, plan_version)
+        if context != self._context:
+            self.invalidate()
+            self._context = context
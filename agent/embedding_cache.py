@@ -0,0 +1,228 @@
+# agent/embedding_cache.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    包裝任意 Embeddings，將向量結果快取在磁碟（SQLite）並以 LRU 淘汰。
+
+    快取鍵為 (model, dimension, 文字雜湊)，embed_query 與 embed_documents 共用同一份快取；
+    只有未命中的文字才會送到底層的 embedding API。
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, dimension: int,
+                 cache_path: str = "../memory/embedding_cache.db",
+                 max_entries: Optional[int] = None, memory_entries: int = 2048):
+        """
+        Args:
+            embeddings (Embeddings): 實際計算向量的 embedding 模型
+            model (str): 模型名稱（快取鍵的一部分）
+            dimension (int): 向量維度（快取鍵的一部分）
+            cache_path (str): SQLite 快取檔路徑
+            max_entries (Optional[int]): 磁碟快取最多保留的筆數
+            memory_entries (int): 記憶體內 LRU 快取的筆數
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.dimension = dimension
+        self.max_entries = max_entries or int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 100000))
+        self.memory_entries = memory_entries
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)")
+        self._conn.commit()
+        self._disk_count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.api_seconds = 0.0
+
+    # ------------------- Embeddings 介面 -------------------
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._lookup(texts)
+        if missing:
+            start = time.perf_counter()
+            computed = self.embeddings.embed_documents(missing)
+            self._record_api_call(start)
+            self._store(missing, computed)
+            vectors.update(zip(missing, computed))
+        return [vectors[t] for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        vectors, missing = self._lookup([text])
+        if missing:
+            start = time.perf_counter()
+            vector = self.embeddings.embed_query(text)
+            self._record_api_call(start)
+            self._store([text], [vector])
+            return vector
+        return vectors[text]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing = self._lookup(texts)
+        if missing:
+            start = time.perf_counter()
+            computed = await self.embeddings.aembed_documents(missing)
+            self._record_api_call(start)
+            self._store(missing, computed)
+            vectors.update(zip(missing, computed))
+        return [vectors[t] for t in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vectors, missing = self._lookup([text])
+        if missing:
+            start = time.perf_counter()
+            vector = await self.embeddings.aembed_query(text)
+            self._record_api_call(start)
+            self._store([text], [vector])
+            return vector
+        return vectors[text]
+
+    # ------------------- 統計 -------------------
+
+    def stats(self) -> Dict:
+        """
+        回傳快取命中統計，以及依平均 API 延遲估算省下的時間。
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            avg_latency = self.api_seconds / self.api_calls if self.api_calls else 0.0
+            return {
+                "model": self.model,
+                "dimension": self.dimension,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "api_calls": self.api_calls,
+                "avg_api_latency_ms": round(avg_latency * 1000, 2),
+                "estimated_saved_ms": round(self.hits * avg_latency * 1000, 2),
+                "memory_entries": len(self._memory),
+                "disk_entries": self._disk_count
+            }
+
+    # ------------------- 內部方法 -------------------
+
+    def _key(self, text: str) -> str:
+        raw = f"{self.model}\0{self.dimension}\0{text}".encode("utf-8")
+        return hashlib.sha256(raw).hexdigest()
+
+    def _lookup(self, texts: List[str]):
+        """
+        依序查詢記憶體與磁碟快取。
+        Returns:
+            (Dict[str, List[float]], List[str]): 已命中的向量，以及需要呼叫 API 的文字（不重複）
+        """
+        found: Dict[str, List[float]] = {}
+        pending: Dict[str, str] = {}
+        seen = set()
+        now = time.time()
+
+        with self._lock:
+            for text in texts:
+                if text in seen:
+                    continue
+                seen.add(text)
+                key = self._key(text)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    found[text] = vector
+                else:
+                    pending[key] = text
+
+            if pending:
+                keys = list(pending.keys())
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, blob in rows:
+                        vector = array("f")
+                        vector.frombytes(blob)
+                        vector = vector.tolist()
+                        found[pending.pop(key)] = vector
+                        self._remember(key, vector)
+                        self._touched[key] = now
+
+            self.hits += len(found)
+            self.misses += len(pending)
+
+            if len(self._touched) >= 256:
+                self._flush_touched()
+
+        return found, list(pending.values())
+
+    def _store(self, texts: List[str], vectors: List[List[float]]):
+        now = time.time()
+        with self._lock:
+            rows = []
+            for text, vector in zip(texts, vectors):
+                key = self._key(text)
+                self._remember(key, list(vector))
+                rows.append((key, array("f", vector).tobytes(), now))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+            )
+            self._disk_count += len(rows)
+            self._flush_touched()
+            self._evict()
+            self._conn.commit()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_touched(self):
+        # 命中時只記在記憶體，累積一批再更新最後使用時間，避免每次命中都寫入
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(t, k) for k, t in self._touched.items()]
+            )
+            self._touched.clear()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._disk_count <= self.max_entries:
+            return
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self.max_entries:
+            # 一次淘汰到上限的 90%，避免每次新增都觸發淘汰
+            target = int(self.max_entries * 0.9)
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (count - target,)
+            )
+            count = target
+        self._disk_count = count
+
+    def _record_api_call(self, start: float):
+        with self._lock:
+            self.api_calls += 1
+            self.api_seconds += time.perf_counter() - start
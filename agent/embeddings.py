@@ -0,0 +1,90 @@
+# agent/embeddings.py
+
+import os
+import zlib
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+
+# 已知 OpenAI 模型的預設維度，避免為了取得維度多打一次 API
+OPENAI_EMBEDDING_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class LocalNgramEmbeddings(Embeddings):
+    """
+    本機 CPU 計算的字元 n-gram 雜湊向量，不需網路。
+
+    中文行為描述（例如「趴著睡覺」「休息/客廳」）以單字與相鄰字組合為主要訊號，
+    因此直接以字元 n-gram 做 feature hashing，再做 L2 正規化。
+    """
+
+    def __init__(self, dimension: int = 512, min_n: int = 1, max_n: int = 3):
+        """
+        Args:
+            dimension (int): 向量維度（雜湊桶數）
+            min_n (int): 最短 n-gram 長度
+            max_n (int): 最長 n-gram 長度
+        """
+        self.dimension = dimension
+        self.min_n = min_n
+        self.max_n = max_n
+
+    @property
+    def model_name(self) -> str:
+        return f"local-ngram-{self.min_n}-{self.max_n}"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype="float32")
+        text = "".join(text.lower().split())
+        for n in range(self.min_n, self.max_n + 1):
+            # 較長的 n-gram 較具辨識度，給予較高權重
+            weight = float(n)
+            for i in range(len(text) - n + 1):
+                h = zlib.crc32(text[i:i + n].encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                vector[h % self.dimension] += sign * weight
+
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+
+
+def get_embedding_provider() -> Tuple[Embeddings, str, int]:
+    """
+    依環境變數 EMBEDDING_PROVIDER（openai / local）建立 embedding 模型。
+    Returns:
+        (Embeddings, str, int): embedding 模型、模型名稱、向量維度
+    """
+    provider = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+
+    if provider == "local":
+        embeddings = LocalNgramEmbeddings(dimension=int(os.getenv("LOCAL_EMBEDDING_DIM", 512)))
+        return embeddings, embeddings.model_name, embeddings.dimension
+
+    if provider == "openai":
+        embedding_key = os.getenv("OPENAI_EMBEDDING_KEY")
+        embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+        # text-embedding-3 系列可指定較小的輸出維度
+        requested_dim = int(os.getenv("OPENAI_EMBEDDING_DIM", 0)) or None
+        embeddings = OpenAIEmbeddings(model=embedding_model, api_key=embedding_key, dimensions=requested_dim)
+
+        dimension = requested_dim or OPENAI_EMBEDDING_DIMENSIONS.get(embedding_model)
+        if dimension is None:
+            # 未知模型：實際呼叫一次取得維度
+            dimension = len(embeddings.embed_query("維度"))
+        return embeddings, embedding_model, dimension
+
+    raise ValueError(f"未知的 EMBEDDING_PROVIDER：{provider}")
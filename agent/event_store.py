@@ -0,0 +1,183 @@
+# agent/event_store.py
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class EventStore:
+    """
+    以 SQLite（WAL 模式）儲存事件紀錄。
+
+    新增事件只會放進待寫入佇列，累積到 batch_size 筆或經過 flush_interval 秒後
+    一次寫入（group commit），啟動時也不需要解析全部歷史事件。
+    """
+
+    def __init__(self, db_path: str = "../memory/events.db", batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        """
+        Args:
+            db_path (str): SQLite 資料庫路徑
+            batch_size (Optional[int]): 累積多少筆事件即寫入
+            flush_interval (Optional[float]): 待寫入事件最多等待的秒數
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size or int(os.getenv("EVENT_STORE_BATCH_SIZE", 32))
+        self.flush_interval = flush_interval or float(os.getenv("EVENT_STORE_FLUSH_INTERVAL", 0.5))
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                time TEXT,
+                trigger TEXT NOT NULL,
+                action TEXT,
+                effectiveness TEXT,
+                created_at REAL,
+                normal INTEGER
+            )"""
+        )
+        # 舊版資料庫沒有 normal 欄位（事件是否被判定為正常，供日常基準學習）
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(events)")}
+        if "normal" not in columns:
+            self._conn.execute("ALTER TABLE events ADD COLUMN normal INTEGER")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_events_time ON events(time)")
+
+        self._lock = threading.RLock()
+        self._pending: List[Dict] = []
+        self._timer: Optional[threading.Timer] = None
+        atexit.register(self.close)
+
+    def append(self, event: Dict) -> None:
+        """
+        新增一筆事件（O(1)，實際寫入由 group commit 處理）。
+        """
+        with self._lock:
+            self._pending.append(event)
+            if len(self._pending) >= self.batch_size:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def extend(self, events: List[Dict]) -> None:
+        """
+        批次新增事件（用於從舊版 memory.json 匯入）。
+        """
+        with self._lock:
+            self._pending.extend(events)
+            self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def last_id(self) -> int:
+        """
+        已寫入的最後一筆事件 ID（會先寫入待寫入的事件）。
+        """
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def count(self) -> int:
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def recent(self, n: int = 10) -> List[Dict]:
+        """
+        取得最近 n 筆事件（由舊到新）。
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT trigger, action, effectiveness FROM events ORDER BY id DESC LIMIT ?", (n,)
+            ).fetchall()
+        return [self._row_to_event(row) for row in reversed(rows)]
+
+    def iter_events(self, trigger_key: Optional[str] = None, trigger_value=None) -> Iterator[Dict]:
+        """
+        依寫入順序逐筆讀取事件，可選擇只取 trigger[trigger_key] == trigger_value 的事件。
+        """
+        self.flush()
+        sql = "SELECT trigger, action, effectiveness FROM events"
+        params = ()
+        if trigger_key is not None:
+            sql += " WHERE json_extract(trigger, ?) IS ?"
+            params = (f'$."{trigger_key}"', trigger_value)
+        sql += " ORDER BY id"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        for row in rows:
+            yield self._row_to_event(row)
+
+    def iter_normal_triggers(self, after_id: int = 0) -> Iterator[Tuple[int, Dict]]:
+        """
+        依寫入順序讀取 id > after_id 且被判定為正常的事件，回傳 (id, trigger)。
+        """
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, trigger FROM events WHERE id > ? AND normal = 1 ORDER BY id", (after_id,)
+            ).fetchall()
+        for row in rows:
+            yield row[0], json.loads(row[1])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush_locked()
+            self._conn.close()
+            self._conn = None
+
+    # ------------------- 內部方法 -------------------
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending or self._conn is None:
+            return
+
+        now = time.time()
+        rows = [
+            (
+                event.get("trigger", {}).get("time"),
+                json.dumps(event.get("trigger", {}), ensure_ascii=False),
+                event.get("action"),
+                event.get("effectiveness"),
+                now,
+                1 if event.get("normal") else 0
+            )
+            for event in self._pending
+        ]
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(
+                "INSERT INTO events (time, trigger, action, effectiveness, created_at, normal) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._pending.clear()
+
+    @staticmethod
+    def _row_to_event(row) -> Dict:
+        return {
+            "trigger": json.loads(row[0]),
+            "action": row[1],
+            "effectiveness": row[2]
+        }
@@ -0,0 +1,141 @@
+# agent/exclusion.py
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+PATTERN_PREFIX = "re:"
+
+
+def normalize_behavior(text: str) -> str:
+    """
+    正規化行為描述：去除所有空白並轉小寫。
+    """
+    return "".join(str(text).split()).lower()
+
+
+def is_pattern(entry: str) -> bool:
+    return entry.startswith(PATTERN_PREFIX) or "*" in entry
+
+
+class ExclusionMatcher:
+    """
+    判斷行為是否屬於排除清單（非異常行為）。
+
+    排除清單的項目分為三種：
+      - 一般字串：正規化後放入 dict（雜湊查詢）
+      - 樣式：含 * 的萬用字元（例如「*睡*」），或以 re: 開頭的正規表示式；
+        全部合併成一個具名群組的正規表示式，一次比對即可得知符合哪一條
+      - 同義詞：{標準行為: [同義詞, ...]}，同義詞會先換成標準行為再比對
+    新增或刪除一般字串時只更新 dict，只有樣式變動時才重新編譯正規表示式。
+    """
+
+    def __init__(self, entries: Iterable[str] = (), synonyms: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            entries (Iterable[str]): 排除清單
+            synonyms (Optional[Dict[str, List[str]]]): 同義詞表
+        """
+        self._exact: Dict[str, str] = {}        # 正規化字串 -> 原始項目
+        self._patterns: List[str] = []          # 原始樣式項目
+        self._regex: Optional[re.Pattern] = None
+        self._synonyms: Dict[str, str] = {}     # 正規化同義詞 -> 標準行為
+        entries = list(entries)
+        patterns = list(dict.fromkeys(e for e in entries if is_pattern(e)))
+        for entry in entries:
+            if not is_pattern(entry):
+                self.add(entry)
+        for canonical, variants in (synonyms or {}).items():
+            self.add_synonyms(canonical, variants)
+        try:
+            self._regex = self._compile(patterns)
+            self._patterns = patterns
+        except re.error:
+            # 清單中有無法合併的樣式（例如手動編輯 memory.json）：逐一加入並略過無效項目
+            for entry in patterns:
+                try:
+                    self.add(entry)
+                except re.error as e:
+                    print(f"[Exclusion] 略過無效的排除樣式 {entry}：{e}")
+
+    def add(self, entry: str) -> None:
+        """
+        新增排除項目。樣式會先與既有樣式合併編譯，成功後才加入；
+        無效的樣式拋出 re.error，排除清單維持不變。
+        """
+        if not is_pattern(entry):
+            self._exact[normalize_behavior(entry)] = entry
+            return
+        if entry in self._patterns:
+            return
+        patterns = self._patterns + [entry]
+        self._regex = self._compile(patterns)
+        self._patterns = patterns
+
+    def remove(self, entry: str) -> None:
+        if is_pattern(entry):
+            if entry in self._patterns:
+                patterns = [p for p in self._patterns if p != entry]
+                self._regex = self._compile(patterns)
+                self._patterns = patterns
+        else:
+            key = normalize_behavior(entry)
+            if self._exact.get(key) == entry:
+                del self._exact[key]
+
+    def add_synonyms(self, canonical: str, variants: Iterable[str]) -> None:
+        for variant in variants:
+            self._synonyms[normalize_behavior(variant)] = canonical
+
+    def remove_synonyms(self, canonical: str) -> None:
+        self._synonyms = {k: v for k, v in self._synonyms.items() if v != canonical}
+
+    def match(self, behavior: Optional[str]) -> Optional[Dict]:
+        """
+        比對行為是否被排除。
+        Returns:
+            Optional[Dict]: 符合時回傳說明（type：exact / synonym / pattern、rule：符合的排除項目，
+                            synonym 另含 canonical），不符合則為 None
+        """
+        if not behavior:
+            return None
+        key = normalize_behavior(behavior)
+        canonical = self._synonyms.get(key)
+        canonical_key = normalize_behavior(canonical) if canonical else None
+
+        if key in self._exact:
+            return {"behavior": behavior, "type": "exact", "rule": self._exact[key]}
+        if canonical_key and canonical_key in self._exact:
+            return {"behavior": behavior, "type": "synonym", "canonical": canonical,
+                    "rule": self._exact[canonical_key]}
+
+        if self._regex is not None:
+            for candidate in filter(None, (key, canonical_key)):
+                m = self._regex.fullmatch(candidate)
+                if m:
+                    # 使用者的正規表示式可能有自己的群組，因此依外層群組名稱找出符合的樣式
+                    index = next(i for i in range(len(self._patterns)) if m.group(f"p{i}") is not None)
+                    rule = self._patterns[index]
+                    result = {"behavior": behavior, "type": "pattern", "rule": rule}
+                    if candidate != key:
+                        result["canonical"] = canonical
+                    return result
+        return None
+
+    def stats(self) -> Dict:
+        return {"exact": len(self._exact), "patterns": len(self._patterns), "synonyms": len(self._synonyms)}
+
+    # ------------------- 內部方法 -------------------
+
+    @classmethod
+    def _compile(cls, patterns: List[str]) -> Optional[re.Pattern]:
+        if not patterns:
+            return None
+        parts = [f"(?P<p{i}>{cls._to_regex(p)})" for i, p in enumerate(patterns)]
+        return re.compile("|".join(parts))
+
+    @staticmethod
+    def _to_regex(entry: str) -> str:
+        if entry.startswith(PATTERN_PREFIX):
+            return entry[len(PATTERN_PREFIX):]
+        # 萬用字元：* 代表任意長度的文字，其餘字元照字面比對
+        return ".*".join(re.escape(normalize_behavior(part)) for part in entry.split("*"))
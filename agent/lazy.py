@@ -0,0 +1,85 @@
+# agent/lazy.py
+
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# 所有已宣告的延遲單例（名稱 -> LazyProxy），供 agent.startup 預熱與回報就緒狀態
+_registry: Dict[str, "LazyProxy"] = {}
+
+
+class LazyProxy:
+    """
+    延遲建立的單例：import 時只記錄 factory，第一次存取屬性（或呼叫 get()）時才建立實例。
+
+    多執行緒同時存取時只會建立一次；建立失敗會保留錯誤，下次存取時重試。
+    """
+
+    def __init__(self, name: str, factory: Callable[[], object]):
+        """
+        Args:
+            name (str): 元件名稱（顯示於 /ready）
+            factory (Callable[[], object]): 建立實例的函式
+        """
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.RLock())
+        object.__setattr__(self, "_seconds", None)
+        object.__setattr__(self, "_error", None)
+        _registry[name] = self
+
+    def get(self):
+        """
+        取得實例，尚未建立時於此建立。
+        """
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                start = time.perf_counter()
+                try:
+                    instance = self._factory()
+                except Exception as e:
+                    object.__setattr__(self, "_error", f"{type(e).__name__}: {e}")
+                    raise
+                object.__setattr__(self, "_seconds", time.perf_counter() - start)
+                object.__setattr__(self, "_error", None)
+                object.__setattr__(self, "_instance", instance)
+                print(f"[Lazy] {self._name} 初始化完成（{self._seconds:.2f}s）")
+            return self._instance
+
+    @property
+    def ready(self) -> bool:
+        return self._instance is not None
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "init_seconds": None if self._seconds is None else round(self._seconds, 3),
+            "error": self._error
+        }
+
+    def __getattr__(self, item):
+        # 只有 proxy 本身沒有的屬性才會進到這裡，轉交給實際的實例
+        return getattr(self.get(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self.get(), key, value)
+
+    def __repr__(self) -> str:
+        state = "ready" if self.ready else "pending"
+        return f"<LazyProxy {self._name} ({state})>"
+
+
+def registered() -> Dict[str, LazyProxy]:
+    """
+    回傳目前已宣告的所有延遲單例。
+    """
+    return dict(_registry)
+
+
+def get_component(name: str) -> Optional[LazyProxy]:
+    return _registry.get(name)
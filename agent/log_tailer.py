@@ -0,0 +1,235 @@
+# agent/log_tailer.py
+
+import bisect
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+
+class LogTailer:
+    """
+    增量讀取 observation log，並維護一個依時間排序的記憶體環狀緩衝區。
+
+    支援兩種輸入格式：
+      - JSONL（每行一筆）：記住已讀取的位元組位置，只解析新追加的內容。
+      - JSON 陣列（舊格式）：檔案未變動時完全不解析，變動時只收錄新增的筆數。
+        每次變動都必須重新解析整個檔案，因此兩次解析至少間隔 array_poll_interval 秒。
+    """
+
+    def __init__(self, path: str, capacity: int = 20000, array_poll_interval: Optional[float] = None):
+        """
+        Args:
+            path (str): log 檔案路徑
+            capacity (int): 緩衝區的目標筆數，超過時淘汰使用端已處理完（release）的最舊資料；
+                            尚未處理的資料不會被淘汰，補讀大量積壓資料時緩衝區可暫時超過此值
+            array_poll_interval (Optional[float]): JSON 陣列格式兩次完整解析的最短間隔秒數，
+                            預設讀取 LOG_ARRAY_POLL_INTERVAL
+        """
+        self.path = path
+        self.capacity = capacity
+        self.array_poll_interval = (array_poll_interval if array_poll_interval is not None
+                                    else float(os.getenv("LOG_ARRAY_POLL_INTERVAL", 5.0)))
+        self.mode: Optional[str] = "jsonl" if path.endswith(".jsonl") else None
+
+        self._offset = 0  # JSONL 模式：已讀取的位元組位置
+        self._array_count = 0  # JSON 陣列模式：已收錄的筆數
+        self._last_stat = None  # JSON 陣列模式：上次解析時的 (size, mtime)
+        self._array_parsed_at = 0.0  # JSON 陣列模式：上次解析的時間（time.monotonic）
+        self._polled_stat = None  # 上次 poll 時檔案的 (size, mtime)，供 has_changed 判斷
+        self._released: Optional[str] = None  # 使用端已處理完的時間水位（time <= 此值的紀錄可淘汰）
+
+        self._times: List[str] = []
+        self._records: List[Dict] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def earliest_time(self) -> Optional[str]:
+        return self._times[0] if self._times else None
+
+    @property
+    def latest_time(self) -> Optional[str]:
+        return self._times[-1] if self._times else None
+
+    def poll(self) -> List[Dict]:
+        """
+        讀取檔案自上次呼叫後新增的紀錄，並放入緩衝區。
+        Returns:
+            List[Dict]: 本次新收錄的紀錄（依時間排序）
+        """
+        if not os.path.isfile(self.path):
+            return []
+        stat = self._stat()
+
+        if self.mode is None:
+            self.mode = self._detect_mode()
+            if self.mode is None:
+                self._polled_stat = stat
+                return []  # 檔案仍是空的
+        if self.mode == "array" and not self._array_due():
+            # 尚未到下次解析的時間：不更新 _polled_stat，間隔到了之後 has_changed 會再回報變動
+            return []
+        self._polled_stat = stat
+
+        if self.mode == "jsonl":
+            new_records = self._poll_jsonl()
+        else:
+            new_records = self._poll_array()
+
+        for record in new_records:
+            self._insert(record)
+        self._trim()
+
+        return sorted(new_records, key=lambda r: r["time"])
+
+    def window(self, start: str, end: str, include_start: bool = True) -> List[Dict]:
+        """
+        取出 start <= time <= end 的紀錄（二分搜尋切片）；include_start=False 時為 start < time <= end。
+        """
+        lo = (bisect.bisect_left if include_start else bisect.bisect_right)(self._times, start)
+        hi = bisect.bisect_right(self._times, end)
+        return self._records[lo:hi]
+
+    def has_changed(self) -> bool:
+        """
+        檔案自上次 poll 後是否有變動（只呼叫 os.stat，不讀取內容）。
+        JSON 陣列格式在兩次解析的最短間隔內一律回傳 False。
+        """
+        if self._stat() == self._polled_stat:
+            return False
+        return self.mode != "array" or self._array_due()
+
+    def next_time_after(self, time_str: str) -> Optional[str]:
+        """
+        回傳第一筆 time > time_str 的時間，沒有則為 None。
+        """
+        lo = bisect.bisect_right(self._times, time_str)
+        return self._times[lo] if lo < len(self._times) else None
+
+    def after(self, time_str: str) -> List[Dict]:
+        """
+        取出 time > time_str 的紀錄（依時間排序）。
+        """
+        lo = bisect.bisect_right(self._times, time_str)
+        return self._records[lo:]
+
+    def release(self, time_str: str) -> None:
+        """
+        使用端已處理完 time <= time_str 的紀錄，之後緩衝區超過上限時可以淘汰它們。
+        """
+        if self._released is None or time_str > self._released:
+            self._released = time_str
+            self._trim()
+
+    def reset(self):
+        """
+        清空緩衝區並從檔案開頭重新讀取。
+        """
+        self._offset = 0
+        self._array_count = 0
+        self._last_stat = None
+        self._polled_stat = None
+        self._times.clear()
+        self._records.clear()
+
+    # ------------------- 內部方法 -------------------
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _array_due(self) -> bool:
+        return time.monotonic() - self._array_parsed_at >= self.array_poll_interval
+
+    def _detect_mode(self) -> Optional[str]:
+        with open(self.path, "rb") as f:
+            while True:
+                ch = f.read(1)
+                if not ch:
+                    return None
+                if not ch.isspace():
+                    return "array" if ch == b"[" else "jsonl"
+
+    def _poll_jsonl(self) -> List[Dict]:
+        size = os.path.getsize(self.path)
+        if size < self._offset:
+            # 檔案被截斷或輪替，從頭開始
+            print("[LogTailer] 偵測到 log 檔被截斷，重新讀取")
+            self.reset()
+        if size == self._offset:
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+
+        # 最後一行若尚未寫完（沒有換行），留待下次再讀
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            return []
+        self._offset += end + 1
+
+        records = []
+        for line in chunk[:end].splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[LogTailer] 略過無法解析的資料：{e}")
+                continue
+            if isinstance(record, dict) and "time" in record:
+                records.append(record)
+        return records
+
+    def _poll_array(self) -> List[Dict]:
+        stat = os.stat(self.path)
+        current = (stat.st_size, stat.st_mtime_ns)
+        if current == self._last_stat:
+            return []
+
+        self._array_parsed_at = time.monotonic()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            # 寫入端可能正在覆寫檔案，下次再讀
+            return []
+        self._last_stat = current
+
+        if not isinstance(data, list):
+            return []
+        if len(data) < self._array_count:
+            print("[LogTailer] 偵測到 log 檔被覆寫，重新讀取")
+            self.reset()
+            self._last_stat = current
+
+        new_records = [r for r in data[self._array_count:] if isinstance(r, dict) and "time" in r]
+        self._array_count = len(data)
+        return new_records
+
+    def _insert(self, record: Dict):
+        t = record["time"]
+        if not self._times or t >= self._times[-1]:
+            self._times.append(t)
+            self._records.append(record)
+        else:
+            idx = bisect.bisect_right(self._times, t)
+            self._times.insert(idx, t)
+            self._records.insert(idx, record)
+
+    def _trim(self):
+        # 分批淘汰，避免每筆新增都搬移整個串列；只淘汰使用端已處理完的紀錄
+        overflow = len(self._records) - self.capacity
+        if overflow <= 0 or overflow < max(1, self.capacity // 10) or self._released is None:
+            return
+        count = min(overflow, bisect.bisect_right(self._times, self._released))
+        if count > 0:
+            del self._times[:count]
+            del self._records[:count]
@@ -1,25 +1,54 @@
 # memory_manager.py
 
+import atexit
 import json
 import os
+import threading
 from typing import Dict, List, Optional
-from agent.summary_memory import SummaryMemory
 from agent.singleton_memory import vector_memory_instance
+from agent.event_store import EventStore
+from agent.summary_worker import SummaryWorker
+from agent.exclusion import ExclusionMatcher, normalize_behavior
+from agent.behavior_baseline import BehaviorBaseline
+from agent.lazy import LazyProxy
 
 
 class MemoryManager:
     def __init__(self, memory_path: str = "../memory/memory.json"):
         self.memory_path = memory_path
+        # 事件另存於 SQLite，memory.json 只保留體積小的狀態資料
         self.memory = {
             "current_state": "一般",  # 可為：一般、觀察、緊急
-            "events": [],
             "excluded_behaviors": [],
+            "behavior_synonyms": {},  # 標準行為 -> 同義詞列表，排除比對時視為相同行為
             "abnormal_behavior":[]
         }
+        self.event_store = EventStore(os.path.join(os.path.dirname(memory_path), "events.db"))
         self.load_memory()
+        # 日常行為基準：只由被判定為正常的事件建立，之後隨 record_event(normal=True) 逐筆更新。
+        # 陣列存於 baseline.npz，啟動時只重播存檔之後新增的事件
+        self.baseline_path = os.path.join(os.path.dirname(memory_path), "baseline.npz")
+        self.baseline_save_every = int(os.getenv("BASELINE_SAVE_EVERY", 200))
+        self.baseline = BehaviorBaseline()
+        self._record_lock = threading.Lock()
+        self._baseline_unsaved = 0
+        last_id = self.baseline.load(self.baseline_path)
+        if last_id > self.event_store.last_id():
+            # 事件資料庫比存檔舊（例如被刪除或還原），存檔不可信，從頭重建
+            self.baseline = BehaviorBaseline()
+            last_id = 0
+        for _, trigger in self.event_store.iter_normal_triggers(after_id=last_id):
+            self.baseline.observe(trigger)
+            self._baseline_unsaved += 1
+        if self._baseline_unsaved:
+            self.save_baseline()
+        atexit.register(self.save_baseline)
 
         # 新增的記憶系統
+        from agent.summary_memory import SummaryMemory
         self.summary_memory = SummaryMemory()
+        # 摘要與向量索引在背景合併執行，不佔用 Agent 回應時間
+        self.summary_worker = SummaryWorker(self.summary_memory)
         self.vector_memory = vector_memory_instance
 
     def load_memory(self):
@@ -27,10 +56,25 @@ class MemoryManager:
             with open(self.memory_path, "r", encoding="utf-8") as f:
                 self.memory = json.load(f)
 
+        # 舊版 memory.json 內含完整事件列表，搬移到事件資料庫後移除
+        legacy_events = self.memory.pop("events", None)
+        if legacy_events:
+            if self.event_store.count() == 0:
+                self.event_store.extend(legacy_events)
+                print(f"[MemoryManager] 已將 {len(legacy_events)} 筆事件匯入事件資料庫")
+            self.save_memory()
+
+        self.memory.setdefault("excluded_behaviors", [])
+        self.memory.setdefault("behavior_synonyms", {})
+        self.exclusions = ExclusionMatcher(self.memory["excluded_behaviors"], self.memory["behavior_synonyms"])
+
     def save_memory(self):
         os.makedirs(os.path.dirname(self.memory_path), exist_ok=True)
-        with open(self.memory_path, "w", encoding="utf-8") as f:
+        # 先寫入暫存檔再取代，避免寫到一半中斷而損毀
+        tmp_path = self.memory_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(self.memory, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.memory_path)
 
     def update_state(self, new_state: str):
         self.memory["current_state"] = new_state
@@ -39,31 +83,93 @@ class MemoryManager:
     def get_current_state(self) -> str:
         return self.memory.get("current_state", "一般")
 
-    def record_event(self, trigger: Dict, action: str, effectiveness: str):
+    def record_event(self, trigger: Dict, action: str, effectiveness: str, normal: bool = False):
+        """
+        Args:
+            normal (bool): 流程判定為正常（已排除、符合日常基準，或 Agent 未採取任何行動），
+                           只有這類事件會納入日常基準
+        """
         event = {
             "trigger": trigger,
             "action": action,
-            "effectiveness": effectiveness
+            "effectiveness": effectiveness,
+            "normal": normal
         }
-        self.memory["events"].append(event)
-        self.save_memory()
+        # 寫入事件與更新基準在同一個鎖內，存檔時記錄的事件 ID 才會與基準內容一致
+        with self._record_lock:
+            self.event_store.append(event)
+            if normal:
+                self.baseline.observe(trigger)
+                self._baseline_unsaved += 1
+        if self._baseline_unsaved >= self.baseline_save_every:
+            self.save_baseline()
+
+    def save_baseline(self):
+        with self._record_lock:
+            if not self._baseline_unsaved:
+                return
+            self.baseline.save(self.baseline_path, self.event_store.last_id())
+            self._baseline_unsaved = 0
+
+    def get_recent_events(self, n: int = 10) -> List[Dict]:
+        return self.event_store.recent(n)
 
     def get_similar_events(self, current_input: Dict) -> List[Dict]:
         # 這裡先用簡單的 key 匹配篩選類似事件
         # 可再進化為相似度比對（如 cosine similarity）
-        similar = []
-        for event in self.memory["events"]:
-            if event["trigger"].get("狀態") == current_input.get("狀態"):
-                similar.append(event)
-        return similar
+        return list(self.event_store.iter_events("狀態", current_input.get("狀態")))
+
+    def add_excluded_behavior(self, behavior: str) -> bool:
+        """
+        Returns:
+            bool: 是否為新加入的項目
+        """
+        if behavior in self.memory["excluded_behaviors"]:
+            return False
+        self.exclusions.add(behavior)  # 無效的樣式會在這裡拋出 re.error
+        self.memory["excluded_behaviors"].append(behavior)
+        self.save_memory()
+        return True
 
-    def add_excluded_behavior(self, behavior: str):
+    def remove_excluded_behavior(self, behavior: str) -> bool:
         if behavior not in self.memory["excluded_behaviors"]:
-            self.memory["excluded_behaviors"].append(behavior)
-            self.save_memory()
+            return False
+        self.memory["excluded_behaviors"].remove(behavior)
+        self.exclusions.remove(behavior)
+        self.save_memory()
+        return True
+
+    def set_behavior_synonyms(self, canonical: str, synonyms: List[str]):
+        self.memory["behavior_synonyms"][canonical] = synonyms
+        self.exclusions.remove_synonyms(canonical)
+        self.exclusions.add_synonyms(canonical, synonyms)
+        self.save_memory()
+
+    def remove_behavior_synonyms(self, canonical: str) -> bool:
+        if self.memory["behavior_synonyms"].pop(canonical, None) is None:
+            return False
+        self.exclusions.remove_synonyms(canonical)
+        self.save_memory()
+        return True
 
     def is_behavior_excluded(self, behavior: str) -> bool:
-        return behavior in self.memory.get("excluded_behaviors", [])
+        return self.exclusions.match(behavior) is not None
+
+    def is_behavior_abnormal(self, behavior: str) -> bool:
+        """
+        行為是否曾被 Agent 記錄為異常（record_event 工具）。記錄內容是自由文字，
+        因此行為出現在任一筆記錄中即視為符合，寧可多送給 Agent 也不要漏判。
+        """
+        key = normalize_behavior(behavior or "")
+        if not key:
+            return False
+        return any(key in normalize_behavior(entry) for entry in self.memory.get("abnormal_behavior", []))
+
+    def explain_exclusion(self, behavior: str) -> Optional[Dict]:
+        """
+        回傳行為符合的排除規則（exact / synonym / pattern），不符合則為 None。
+        """
+        return self.exclusions.match(behavior)
 
     # 新增對話記憶與摘要同步
     def add_conversation(self, user_input: str, ai_output: str):
@@ -76,5 +182,13 @@ class MemoryManager:
     def search_similar_memory(self, query: str):
         return self.vector_memory.query_memory(query)
 
+    async def asearch_similar_memory(self, query: str):
+        return await self.vector_memory.aquery_memory(query)
+
+
+# 第一次使用時才建立（會連帶建立 SummaryMemory）
+memory = LazyProxy("memory", MemoryManager)
+
 
-memory = MemoryManager()
+def get_memory_manager() -> MemoryManager:
+    return memory.get()
@@ -9,6 +9,7 @@ class PlanManager:
 
     def __init__(self, path: str = "../memory/plan.json"):
         self.path = path
+        self.version = 0  # 每次儲存遞增，供快取判斷計畫是否變動
         self.plan = {
             "daily_plan": [],
             "current_plan": [],
@@ -24,6 +25,7 @@ class PlanManager:
             self.save()
 
     def save(self):
+        self.version += 1
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
         with open(self.path, "w", encoding="utf-8") as f:
             json.dump(self.plan, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,205 @@
+# agent/response_log.py
+
+import io
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard  # 可選：壓縮已輪替的檔案
+except ImportError:
+    zstandard = None
+
+
+class ResponseLog:
+    """
+    Agent 回應的追加式 JSONL 紀錄檔。
+
+    每筆回應只追加一行，不再讀取與覆寫整個檔案；目前寫入中的檔案超過大小
+    或時間上限時會輪替成 `<名稱>.<最早時間>-<最晚時間>.jsonl`，並可選擇以 zstd 壓縮。
+    """
+
+    def __init__(self, path: str, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[int] = None, compress: Optional[bool] = None):
+        """
+        Args:
+            path (str): 目前寫入中的 JSONL 檔案路徑
+            max_bytes (Optional[int]): 超過此大小即輪替
+            max_age_seconds (Optional[int]): 檔案開啟超過此秒數即輪替
+            compress (Optional[bool]): 是否以 zstd 壓縮輪替後的檔案
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes or int(os.getenv("RESPONSE_LOG_MAX_BYTES", 10 * 1024 * 1024))
+        self.max_age_seconds = max_age_seconds or int(os.getenv("RESPONSE_LOG_MAX_AGE", 24 * 3600))
+        if compress is None:
+            compress = os.getenv("RESPONSE_LOG_COMPRESS", "True").lower() == "true"
+        self.compress = compress and zstandard is not None
+
+        self._lock = threading.Lock()
+        self._stem = self.path.name[:-len(".jsonl")] if self.path.name.endswith(".jsonl") else self.path.name
+        self._segment_pattern = re.compile(
+            rf"^{re.escape(self._stem)}\.(\d+)-(\d+)(?:\.\d+)?\.jsonl(\.zst)?$"
+        )
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._first: Optional[str] = None
+        self._last: Optional[str] = None
+        self._opened_at = time.time()
+        self._recover_active_file()
+
+    def append(self, response: Dict, time_str: Optional[str] = None) -> None:
+        """
+        追加一筆 Agent 回應。
+        Args:
+            response (Dict): Agent 回傳的字典資料
+            time_str (Optional[str]): 這筆回應對應的模擬時間（%Y%m%d%H%M%S），
+                未提供時使用 input 中的時間或目前時間
+        """
+        record_time = self._resolve_time(response, time_str)
+        line = json.dumps({
+            "time": record_time,
+            "logged_at": datetime.now().isoformat(timespec="seconds"),
+            "response": response
+        }, ensure_ascii=False) + "\n"
+
+        with self._lock:
+            if self._should_rotate():
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+            self._first = min(self._first, record_time) if self._first else record_time
+            self._last = max(self._last, record_time) if self._last else record_time
+
+    def iter_range(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict]:
+        """
+        依時間範圍串流讀回紀錄（含已輪替與壓縮的檔案）。
+        Args:
+            start (Optional[str]): 起始時間（含），None 表示不限
+            end (Optional[str]): 結束時間（含），None 表示不限
+        Returns:
+            Iterator[Dict]: 每筆包含 time、logged_at、response 的紀錄
+        """
+        for seg_path, first, last in self._list_segments():
+            if (start and last < start) or (end and first > end):
+                continue
+            yield from self._iter_file(seg_path, start, end)
+
+        with self._lock:
+            exists = self.path.exists()
+        if exists:
+            yield from self._iter_file(self.path, start, end)
+
+    def read_range(self, start: Optional[str] = None, end: Optional[str] = None,
+                   limit: Optional[int] = None) -> List[Dict]:
+        results = []
+        for record in self.iter_range(start, end):
+            results.append(record)
+            if limit and len(results) >= limit:
+                break
+        return results
+
+    # ------------------- 內部方法 -------------------
+
+    @staticmethod
+    def _resolve_time(response: Dict, time_str: Optional[str]) -> str:
+        candidates = [time_str]
+        if isinstance(response.get("input"), dict):
+            candidates.append(response["input"].get("time"))
+        for candidate in candidates:
+            if isinstance(candidate, str) and candidate.isdigit():
+                return candidate
+        return datetime.now().strftime("%Y%m%d%H%M%S")
+
+    def _recover_active_file(self):
+        """
+        重新開啟既有檔案：補上被中斷的半行，並取回時間範圍。
+        """
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                # 上次寫入途中程式中斷，讓半行資料獨立成一行（讀取時會被略過）
+                f.write(b"\n")
+
+        for record in self._iter_file(self.path, None, None):
+            t = record["time"]
+            self._first = min(self._first, t) if self._first else t
+            self._last = max(self._last, t) if self._last else t
+
+    def _should_rotate(self) -> bool:
+        if not self.path.exists():
+            return False
+        size = self.path.stat().st_size
+        if size == 0:
+            return False
+        return size >= self.max_bytes or time.time() - self._opened_at >= self.max_age_seconds
+
+    def _rotate(self):
+        first = self._first or datetime.now().strftime("%Y%m%d%H%M%S")
+        last = self._last or first
+        base = f"{self._stem}.{first}-{last}"
+        target = self.path.with_name(f"{base}.jsonl")
+        n = 1
+        while target.exists() or target.with_name(target.name + ".zst").exists():
+            target = self.path.with_name(f"{base}.{n}.jsonl")
+            n += 1
+
+        os.replace(self.path, target)
+        if self.compress:
+            compressed = target.with_name(target.name + ".zst")
+            with open(target, "rb") as src, open(compressed, "wb") as dst:
+                zstandard.ZstdCompressor(level=3).copy_stream(src, dst)
+            os.remove(target)
+            target = compressed
+
+        print(f"[ResponseLog] 已輪替紀錄檔：{target.name}")
+        self._first = None
+        self._last = None
+        self._opened_at = time.time()
+
+    def _list_segments(self) -> List[Tuple[Path, str, str]]:
+        segments = []
+        for p in self.path.parent.iterdir():
+            match = self._segment_pattern.match(p.name)
+            if match:
+                if match.group(3) and zstandard is None:
+                    print(f"[ResponseLog] 未安裝 zstandard，略過壓縮檔：{p.name}")
+                    continue
+                segments.append((p, match.group(1), match.group(2)))
+        segments.sort(key=lambda s: (s[1], s[0].name))
+        return segments
+
+    @staticmethod
+    def _iter_file(path: Path, start: Optional[str], end: Optional[str]) -> Iterator[Dict]:
+        if path.name.endswith(".zst"):
+            raw = open(path, "rb")
+            stream = io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw), encoding="utf-8")
+        else:
+            raw = None
+            stream = open(path, "r", encoding="utf-8")
+
+        try:
+            for line in stream:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 中斷寫入留下的半行
+                t = record.get("time", "")
+                if (start and t < start) or (end and t > end):
+                    continue
+                yield record
+        finally:
+            stream.close()
+            if raw is not None:
+                raw.close()
@@ -0,0 +1,86 @@
+# agent/run_budget.py
+
+import os
+import time
+from typing import Dict, Optional
+
+LIMITS = ("iterations", "tool_calls", "deadline")
+
+
+class RunBudget:
+    """
+    單次 Agent 執行的預算：外層推理輪數、工具呼叫次數與總執行時間。
+    任一項用完即記錄在 exhausted，呼叫端應停止推理並改用預設回應。
+    """
+
+    def __init__(self, max_iterations: Optional[int] = None, max_tool_calls: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            max_iterations (Optional[int]): 外層推理輪數上限，預設讀取 AGENT_MAX_ITERATIONS
+            max_tool_calls (Optional[int]): 工具呼叫次數上限，預設讀取 AGENT_MAX_TOOL_CALLS
+            timeout (Optional[float]): 總執行秒數上限，預設讀取 AGENT_RUN_TIMEOUT
+        """
+        self.max_iterations = max_iterations or int(os.getenv("AGENT_MAX_ITERATIONS", 3))
+        self.max_tool_calls = max_tool_calls or int(os.getenv("AGENT_MAX_TOOL_CALLS", 12))
+        self.timeout = timeout or float(os.getenv("AGENT_RUN_TIMEOUT", 60))
+        self.started_at = time.monotonic()
+        self.iterations = 0
+        self.tool_calls = 0
+        self.exhausted: Optional[str] = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.timeout - (time.monotonic() - self.started_at))
+
+    def start_iteration(self) -> bool:
+        """
+        開始新的一輪推理前呼叫。
+        Returns:
+            bool: 是否還有預算
+        """
+        if self.iterations >= self.max_iterations:
+            self.exhausted = "iterations"
+        elif self.remaining() <= 0:
+            self.exhausted = "deadline"
+        else:
+            self.iterations += 1
+        return self.exhausted is None
+
+    def allow_tool_calls(self, n: int) -> bool:
+        """
+        Agent 決定執行 n 個工具時呼叫（工具實際執行前）。
+        Returns:
+            bool: 是否允許執行
+        """
+        if self.tool_calls + n > self.max_tool_calls:
+            self.exhausted = "tool_calls"
+            return False
+        self.tool_calls += n
+        return True
+
+    def expire(self) -> None:
+        self.exhausted = "deadline"
+
+
+class BudgetCounters:
+    """
+    統計各項預算用完的次數。
+    """
+
+    def __init__(self):
+        self.runs = 0
+        self.exhausted: Dict[str, int] = {name: 0 for name in LIMITS}
+        self.elapsed_max = 0.0
+
+    def record(self, budget: RunBudget) -> None:
+        self.runs += 1
+        self.elapsed_max = max(self.elapsed_max, time.monotonic() - budget.started_at)
+        if budget.exhausted:
+            self.exhausted[budget.exhausted] += 1
+
+    def stats(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "exhausted": dict(self.exhausted),
+            "elapsed_max_seconds": round(self.elapsed_max, 3)
+        }
@@ -1,23 +1,35 @@
 # agent/server.py
 
 import os
+import re
+import json
 import asyncio
 from agent.singleton_memory import vector_memory_instance as vm
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
-from agent.agent_core import PetCareAgent
+from fastapi.responses import JSONResponse, StreamingResponse
 from agent.memory_manager import memory
 from agent.singleton_plan import plan_manager_instance as plan_manager
-from agent.utils import load_input_json, store_agent_response
-from datetime import datetime, timedelta
+from agent.log_tailer import LogTailer
+from agent.response_log import ResponseLog
 from agent.tools import check_daily_plan_conflict, add_plan_item
-from langchain_openai import ChatOpenAI
+from agent.lazy import LazyProxy
+from agent.startup import warm_up, readiness
+from agent.window_queue import WindowQueue
+from agent.window_scheduler import WindowScheduler
+from agent.checkpoint import CheckpointStore
+from agent.tool_memo import memo_stats as tool_memo_stats
 from concurrent.futures import ThreadPoolExecutor
 
 app = FastAPI()
 
-# 初始化 Agent
-agent = PetCareAgent()
+
+def _create_agent():
+    from agent.agent_core import PetCareAgent
+    return PetCareAgent()
+
+
+# 初始化 Agent（啟動時於背景預熱，import 本模組不會建立）
+agent = LazyProxy("agent", _create_agent)
 
 # WebSocket 連線列表
 active_connections = []
@@ -27,55 +39,80 @@ executor = ThreadPoolExecutor()
 
 # 讀取 Log 用的紀錄
 last_processed_index = 0
-LOG_FILE_PATH = "../input/log.json"
+LOG_FILE_PATH = os.getenv("PET_LOG_PATH", "../input/log.jsonl")
 INPUT_DIR = "../input"
 OUTPUT_DIR = "../output"
-latest_sim_time = datetime.strptime("20250429120000", "%Y%m%d%H%M%S")  # 初始模擬時間
+MEMORY_DIR = "../memory"
 # 確保 input/output 目錄存在
 os.makedirs(INPUT_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-async def periodic_log_monitor():
-    global latest_sim_time
-    while True:
-        try:
-            log_data = load_input_json("../input/log.json")
-            if not log_data:
-                await asyncio.sleep(300)
-                continue
+# 增量讀取 log，避免每次重新載入整個檔案
+log_tailer = LogTailer(LOG_FILE_PATH)
+# 已處理的 observation 與排程起點存於記憶資料夾，重新啟動後從中斷處繼續
+checkpoint = CheckpointStore(os.path.join(MEMORY_DIR, "checkpoint.db"))
+# 依資料水位切出已完整的視窗（初始時間為檢查點或 WINDOW_START_TIME）
+window_scheduler = WindowScheduler(log_tailer, checkpoint=checkpoint)
+# Agent 回應採追加式寫入，超過大小或時間時自動輪替
+response_log = ResponseLog(f"{OUTPUT_DIR}/output.jsonl")
 
-            next_sim_time = latest_sim_time + timedelta(minutes=5)
-            five_min_ago = latest_sim_time.strftime("%Y%m%d%H%M%S")
-            current_time = next_sim_time.strftime("%Y%m%d%H%M%S")
-            window_logs = [log for log in log_data if five_min_ago <= log["time"] <= current_time]
+async def process_window_logs(logs, current_time):
+    if not agent.ready:
+        # 預熱尚未完成時在執行緒中等待，避免阻塞事件迴圈
+        await asyncio.get_running_loop().run_in_executor(executor, agent.get)
+    # 回應寫入後才記為已處理：在此之前中斷，重新啟動後會再處理一次；
+    # 推理失敗時排入重試（重試次數用完才放棄），被取消時留待重新啟動後處理；錯誤由 KeyedTaskGroup 記錄
+    with window_scheduler.processing(logs, current_time):
+        result = await agent.run_with_log_window(logs, current_time)
+        response_log.append(result, current_time)
+    await broadcast(result)
 
-            if window_logs:
-                asyncio.create_task(process_window_logs(window_logs, current_time))
-            else:
-                print("此時段無資料，跳過但仍推進時間")
+# 各視窗的推理直接在伺服器的事件迴圈上執行：未完成的視窗數有上限（WINDOW_QUEUE_MAX），
+# 同時執行數有上限，同一隻寵物的視窗依序處理
+window_queue = WindowQueue(process_window_logs,
+                           on_drop=lambda logs, _: window_scheduler.settle(logs, processed=False))
 
-            #  每次都推進
-            latest_sim_time = next_sim_time
+async def periodic_log_monitor():
+    while True:
+        try:
+            log_tailer.poll()
+            # 落後時連續送出所有已完整的視窗（佇列已滿時在 put 等待），不同寵物的視窗並行處理
+            for start, end, window_logs in window_scheduler.ready_windows():
+                for pet_id, pet_logs in group_logs_by_pet(window_logs).items():
+                    await window_queue.put(pet_id, pet_logs, end)
 
         except Exception as e:
             print(f"[Server Error] {str(e)}")
+            await asyncio.sleep(window_scheduler.poll_interval)
+            continue
 
-        await asyncio.sleep(30)
+        # 已追上資料水位，等待 log 檔有新資料
+        await window_scheduler.wait_for_data()
 
-async def process_window_logs(logs, current_time):
-    loop = asyncio.get_running_loop()
-    result = await loop.run_in_executor(executor, lambda: asyncio.run(agent.run_with_log_window(logs, current_time)))
-
-    store_agent_response(result, f"{OUTPUT_DIR}/output.json")
-    await broadcast(result)
+def group_logs_by_pet(logs: list) -> dict:
+    """
+    依 pet_id 分組（未標示的 log 視為同一隻寵物 "default"），保留原本的時間順序。
+    """
+    groups = {}
+    for log in logs:
+        groups.setdefault(str(log.get("pet_id", "default")), []).append(log)
+    return groups
 
-# 啟動背景任務：監控 log.json 並推理
+# 啟動背景任務：監控 log 檔並推理
 @app.on_event("startup")
 async def startup_event():
+    # 於背景平行建立 Agent 與記憶模組，伺服器不必等待即可接受連線，就緒狀態見 /ready
+    asyncio.get_running_loop().run_in_executor(executor, warm_up)
     # 啟動背景任務
     asyncio.create_task(periodic_log_monitor())
 
 
+@app.get("/ready")
+async def get_ready():
+    status = readiness()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+
 async def broadcast(message: dict):
     """
     推播消息給所有連線中的 WebSocket 客戶端
@@ -158,11 +195,23 @@ def format_recent_events(events: list) -> list:
 
 @app.get("/recent_records")
 async def get_recent_records():
-    events = memory.memory.get("events", [])
-    formatted = format_recent_events(events[-10:])
+    events = memory.get_recent_events(10)
+    formatted = format_recent_events(events)
     return JSONResponse(content=formatted)
 
 
+@app.get("/responses")
+async def get_responses(start: str = None, end: str = None):
+    """
+    依時間範圍（%Y%m%d%H%M%S）以 JSONL 串流回傳 Agent 的歷史回應
+    """
+    def stream():
+        for record in response_log.iter_range(start, end):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 @app.get("/excluded_behaviors")
 async def get_excluded_behaviors():
     return JSONResponse(content=memory.memory.get("excluded_behaviors", []))
@@ -174,14 +223,50 @@ async def add_excluded_behaviors(item: dict):
     if not behavior:
         return JSONResponse(status_code=400, content={"error": "缺少 'behavior' 欄位"})
 
-    if behavior not in memory.memory["excluded_behaviors"]:
-        memory.memory["excluded_behaviors"].append(behavior)
-        memory.save_memory()
+    try:
+        added = memory.add_excluded_behavior(behavior)
+    except re.error as e:
+        return JSONResponse(status_code=400, content={"error": f"無效的樣式「{behavior}」：{e}"})
+    if added:
         return {"status": f"已加入排除行為：{behavior}"}
     else:
         return {"status": f"行為「{behavior}」已經在排除清單中"}
 
 
+@app.get("/excluded_behaviors/explain")
+async def explain_excluded_behavior(behavior: str):
+    """
+    說明行為是否被排除，以及符合哪一條排除規則。
+    """
+    match = memory.explain_exclusion(behavior)
+    return {"behavior": behavior, "excluded": match is not None, "match": match}
+
+
+@app.get("/behavior_synonyms")
+async def get_behavior_synonyms():
+    return JSONResponse(content=memory.memory.get("behavior_synonyms", {}))
+
+
+@app.post("/behavior_synonyms")
+async def set_behavior_synonyms(item: dict):
+    canonical = item.get("behavior")
+    synonyms = item.get("synonyms")
+    if not canonical or not isinstance(synonyms, list):
+        return JSONResponse(status_code=400, content={"error": "需要 'behavior' 與 'synonyms'（列表）欄位"})
+    memory.set_behavior_synonyms(canonical, synonyms)
+    return {"status": f"已設定「{canonical}」的同義詞：{synonyms}"}
+
+
+@app.delete("/behavior_synonyms")
+async def delete_behavior_synonyms(item: dict):
+    canonical = item.get("behavior")
+    if not canonical:
+        return JSONResponse(status_code=400, content={"error": "缺少 'behavior' 欄位"})
+    if memory.remove_behavior_synonyms(canonical):
+        return {"status": f"已移除「{canonical}」的同義詞"}
+    return JSONResponse(status_code=404, content={"error": f"行為「{canonical}」沒有設定同義詞"})
+
+
 @app.get("/abnormal_behaviors")
 async def get_abnormal_behaviors():
     excluded = memory.memory.get("abnormal_behaviors", [])
@@ -194,9 +279,7 @@ async def delete_excluded_behaviors(item: dict):
     if not behavior:
         return JSONResponse(status_code=400, content={"error": "缺少 'behavior' 欄位"})
 
-    if behavior in memory.memory["excluded_behaviors"]:
-        memory.memory["excluded_behaviors"].remove(behavior)
-        memory.save_memory()
+    if memory.remove_excluded_behavior(behavior):
         return {"status": f"已從排除清單中移除：{behavior}"}
 
     else:
@@ -224,12 +307,15 @@ async def delete_current_plan(item: dict):
 
 
 # ------------------- 向量記憶庫 API -------------------
+# 視窗推理與這些端點共用同一個事件迴圈：embedding 請求、FAISS 與 SQLite 寫入一律交給執行緒池
+# （vm 第一次使用時才建立，建立過程也在執行緒池中進行）
 
 @app.get("/vector_memory/all")
 async def list_vector_memory():
-    docs = vm.vector_store.docstore._dict.values()
-    contents = [doc.page_content for doc in docs]
-    return {"count": len(contents), "data": contents}
+    memories = await asyncio.get_running_loop().run_in_executor(executor, lambda: vm.list_memories())
+    ids = [doc_id for doc_id, _ in memories]
+    contents = [text for _, text in memories]
+    return {"count": len(contents), "data": contents, "ids": ids}
 
 
 @app.post("/vector_memory")
@@ -238,35 +324,26 @@ async def add_vector_memory(item: dict):
     if not text:
         return JSONResponse(status_code=400, content={"error": "缺少 'text' 欄位"})
 
-    vm.add_memory([text])
+    await asyncio.get_running_loop().run_in_executor(executor, lambda: vm.add_memory([text]))
     return {"status": "已加入向量記憶庫", "text": text}
 
 
 @app.delete("/vector_memory")
 async def delete_vector_memory(item: dict):
+    doc_id = item.get("id")
     text = item.get("text")
-    if not text:
-        return JSONResponse(status_code=400, content={"error": "缺少 'text' 欄位"})
-
-    docstore = vm.vector_store.docstore._dict
+    if not doc_id and not text:
+        return JSONResponse(status_code=400, content={"error": "缺少 'id' 或 'text' 欄位"})
 
-    to_delete = [k for k, doc in docstore.items() if doc.page_content == text]
+    loop = asyncio.get_running_loop()
+    to_delete = [doc_id] if doc_id else await loop.run_in_executor(executor, lambda: vm.find_ids(text))
 
-    if not to_delete:
+    # 依 id 直接移除向量，不需重新計算其他記憶的 embedding
+    deleted = await loop.run_in_executor(executor, lambda: vm.delete_memory(to_delete))
+    if not deleted:
         return JSONResponse(status_code=404, content={"error": "找不到完全符合的記憶"})
 
-    for key in to_delete:
-        del docstore[key]
-
-    # 移除對應的 index entry
-    new_docs = list(docstore.values())
-    new_texts = [doc.page_content for doc in new_docs]
-
-    # 重新建立 vector store（簡單暴力但正確）
-    vm.initialize_vector_store()
-    vm.add_memory(new_texts)
-
-    return {"status": f"已刪除 {len(to_delete)} 筆記憶", "text": text}
+    return {"status": f"已刪除 {deleted} 筆記憶", "text": text, "id": doc_id}
 
 import re
 
@@ -284,7 +361,7 @@ async def ask_agent(item: dict):
         return JSONResponse(status_code=400, content={"error": "缺少 'text'"})
 
     # 1. 查詢 FAISS 記憶
-    results = vm.query_memory(text, top_k=5)
+    results = await vm.aquery_memory(text, top_k=5)
     context = "\n".join([f"- {extract_clean_text(r['text'])}" for r in results]) or "（目前無可參考的記憶）"
 
     #context = "\n".join([f"- {r['text']}" for r in results]) or "（目前無可參考的記憶）"
@@ -297,8 +374,9 @@ async def ask_agent(item: dict):
 請根據上面資訊，用中文回答。"""
 
     # 3. 呼叫 GPT 模型
+    from langchain_openai import ChatOpenAI
     chat = ChatOpenAI(model="gpt-4o-mini", temperature=0.5, api_key=os.getenv("OPENAI_CHAT_KEY"))
-    answer = chat.invoke(prompt).content
+    answer = (await chat.ainvoke(prompt)).content
 
     # 格式化結果
     formatted = f"Agent: {answer}\n\n參考記憶：\n{context}"
@@ -306,6 +384,25 @@ async def ask_agent(item: dict):
     return {"answer": formatted}
 
 
+@app.get("/metrics")
+async def get_metrics():
+    return {
+        "embedding_cache": vm.embeddings.stats(),
+        "query_cache": vm.query_cache_stats(),
+        "vector_index": vm.index_stats(),
+        "summary_index": memory.summary_memory.index_stats(),
+        "summary_worker": memory.summary_worker.stats(),
+        "window_queue": window_queue.stats(),
+        "scheduler": window_scheduler.stats(),
+        "checkpoint": checkpoint.stats(),
+        "exclusions": memory.exclusions.stats(),
+        "baseline": memory.baseline.stats(),
+        "decision_cache": agent.decision_cache.stats() if agent.ready else None,
+        "agent_budget": agent.budget_counters.stats() if agent.ready else None,
+        "tool_memo": tool_memo_stats.stats()
+    }
+
+
 # ------------------- End -------------------
 
 if __name__ == "__main__":
@@ -1,6 +1,16 @@
 # agent/singleton_memory.py
 
-from agent.vector_memory import VectorMemory
+from agent.lazy import LazyProxy
 
-# 建立唯一實例
-vector_memory_instance = VectorMemory()
+
+def _create_vector_memory():
+    from agent.vector_memory import VectorMemory
+    return VectorMemory()
+
+
+# 唯一實例（第一次使用時才建立，import 本模組不會載入 FAISS 或 embedding 模型）
+vector_memory_instance = LazyProxy("vector_memory", _create_vector_memory)
+
+
+def get_vector_memory():
+    return vector_memory_instance.get()
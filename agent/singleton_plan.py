@@ -1,4 +1,14 @@
-from agent.plan_manager import PlanManager
+from agent.lazy import LazyProxy
 
-# 全域唯一 PlanManager 實例
-plan_manager_instance = PlanManager()
\ No newline at end of file
+
+def _create_plan_manager():
+    from agent.plan_manager import PlanManager
+    return PlanManager()
+
+
+# 全域唯一 PlanManager 實例（第一次使用時才建立）
+plan_manager_instance = LazyProxy("plan_manager", _create_plan_manager)
+
+
+def get_plan_manager():
+    return plan_manager_instance.get()
@@ -0,0 +1,259 @@
+# agent/sqlite_docstore.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+
+def content_hash(text: str) -> str:
+    """
+    計算記憶內容的雜湊值，用於判斷是否已存入向量資料庫。
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SqliteDocstore(Docstore, AddableMixin):
+    """
+    以 SQLite 儲存向量記憶的文件內容，取代 pickle 格式的 InMemoryDocstore。
+
+    每筆文件記錄 FAISS 索引位置（pos）與內容雜湊（hash），啟動時不需讀入任何文件，
+    查詢時才依 id 或位置讀取。
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path (str): SQLite 資料庫路徑
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS docs (
+                id TEXT PRIMARY KEY,
+                pos INTEGER,
+                hash TEXT NOT NULL,
+                text TEXT NOT NULL,
+                metadata TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_pos ON docs(pos)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_hash ON docs(hash)")
+        # 已刪除但位置尚未回收的索引位置（HNSW 的向量仍在索引中，IVF 的 id 不重複使用）
+        self._conn.execute("CREATE TABLE IF NOT EXISTS tombstones (pos INTEGER PRIMARY KEY)")
+
+        # LangChain FAISS 使用的 index_to_docstore_id（索引位置 -> 文件 id）
+        self.positions = PositionMap(self)
+
+    # ------------------- Docstore 介面 -------------------
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        """
+        新增文件（索引位置由 positions.update 設定）。
+        """
+        rows = [
+            (doc_id, content_hash(doc.page_content), doc.page_content,
+             json.dumps(doc.metadata, ensure_ascii=False) if doc.metadata else None)
+            for doc_id, doc in texts.items()
+        ]
+        with self._lock:
+            try:
+                self._execute_many("INSERT INTO docs (id, hash, text, metadata) VALUES (?, ?, ?, ?)", rows)
+            except sqlite3.IntegrityError as e:
+                raise ValueError(f"文件 id 已存在：{e}")
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute("SELECT text, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]) if row[1] else {})
+
+    def delete(self, ids: List, compact: bool = True) -> None:
+        """
+        刪除文件。
+        Args:
+            ids (List): 文件 id
+            compact (bool): 是否將其後的索引位置往前遞補（與 IndexFlat.remove_ids 的行為一致）；
+                False 時位置改記為墓碑，之後由 compact_tombstones() 一次回收
+        """
+        positions = self.positions_of(ids)
+        with self._lock:
+            if compact:
+                self._execute_many("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+                self._compact_positions(positions)
+                return
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+                self._conn.executemany("INSERT OR IGNORE INTO tombstones (pos) VALUES (?)", [(p,) for p in positions])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ------------------- 查詢 -------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def iter_documents(self) -> Iterator[Tuple[str, Document]]:
+        """
+        依索引位置順序逐筆讀取 (id, Document)。
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT id, text, metadata FROM docs ORDER BY pos").fetchall()
+        for doc_id, text, metadata in rows:
+            yield doc_id, Document(id=doc_id, page_content=text, metadata=json.loads(metadata) if metadata else {})
+
+    def ids_by_hash(self, h: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM docs WHERE hash = ? ORDER BY pos", (h,)).fetchall()
+        return [r[0] for r in rows]
+
+    def existing_hashes(self, hashes: Iterable[str]) -> Set[str]:
+        """
+        回傳已存在於資料庫中的內容雜湊。
+        """
+        hashes = list(hashes)
+        found = set()
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT DISTINCT hash FROM docs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update(r[0] for r in rows)
+        return found
+
+    def positions_of(self, ids: Iterable[str]) -> List[int]:
+        ids = list(ids)
+        positions = []
+        with self._lock:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT pos FROM docs WHERE pos IS NOT NULL AND id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                positions.extend(r[0] for r in rows)
+        return sorted(positions)
+
+    def tombstones(self) -> List[int]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT pos FROM tombstones ORDER BY pos").fetchall()]
+
+    def compact_tombstones(self) -> None:
+        """
+        索引已重建為不含墓碑的版本後呼叫：回收墓碑位置，其餘位置往前遞補。
+        """
+        with self._lock:
+            self._compact_positions(self.tombstones())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM docs")
+            self._conn.execute("DELETE FROM tombstones")
+            self.positions.invalidate(0)
+
+    # ------------------- 內部方法 -------------------
+
+    def _execute_many(self, sql: str, rows: List[tuple]):
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(sql, rows)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _compact_positions(self, removed: List[int]):
+        if not removed:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS removed_pos (pos INTEGER PRIMARY KEY)")
+            self._conn.execute("DELETE FROM removed_pos")
+            self._conn.executemany("INSERT INTO removed_pos (pos) VALUES (?)", [(p,) for p in removed])
+            self._conn.execute(
+                "UPDATE docs SET pos = pos - (SELECT COUNT(*) FROM removed_pos r WHERE r.pos < docs.pos) "
+                "WHERE pos IS NOT NULL"
+            )
+            self._conn.execute("DELETE FROM tombstones WHERE pos IN (SELECT pos FROM removed_pos)")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        count = self.positions._count
+        self.positions.invalidate(None if count is None else count - len(removed))
+
+
+class PositionMap:
+    """
+    索引位置 -> 文件 id 的對應表，實際資料存在 SqliteDocstore 的 pos 欄位，
+    提供 LangChain FAISS 需要的 dict 介面（[]、len、update、items 等）。
+    len() 包含墓碑位置，即下一筆新增文件的位置。
+    """
+
+    def __init__(self, docstore: SqliteDocstore):
+        self._store = docstore
+        self._count: Optional[int] = None  # 第一次用到時才計算
+
+    def __getitem__(self, pos: int) -> str:
+        with self._store._lock:
+            row = self._store._conn.execute("SELECT id FROM docs WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def get(self, pos: int, default=None):
+        try:
+            return self[pos]
+        except KeyError:
+            return default
+
+    def __contains__(self, pos) -> bool:
+        return self.get(pos) is not None
+
+    def __len__(self) -> int:
+        with self._store._lock:
+            if self._count is None:
+                self._count = self._store._conn.execute(
+                    "SELECT (SELECT COUNT(*) FROM docs WHERE pos IS NOT NULL) + (SELECT COUNT(*) FROM tombstones)"
+                ).fetchone()[0]
+            return self._count
+
+    def update(self, mapping: Dict[int, str]) -> None:
+        with self._store._lock:
+            self._store._execute_many(
+                "UPDATE docs SET pos = ? WHERE id = ?", [(int(pos), doc_id) for pos, doc_id in mapping.items()]
+            )
+            # LangChain 只會以 update 設定新加入文件的位置
+            if self._count is not None:
+                self._count += len(mapping)
+
+    def items(self) -> List[Tuple[int, str]]:
+        with self._store._lock:
+            return self._store._conn.execute(
+                "SELECT pos, id FROM docs WHERE pos IS NOT NULL ORDER BY pos"
+            ).fetchall()
+
+    def keys(self) -> List[int]:
+        return [pos for pos, _ in self.items()]
+
+    def values(self) -> List[str]:
+        return [doc_id for _, doc_id in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def invalidate(self, count: Optional[int] = None):
+        self._count = count
@@ -0,0 +1,58 @@
+# agent/startup.py
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from agent.lazy import registered
+
+# 伺服器啟動時預先建立的元件（依賴較重的放前面，讓它們先開始）
+DEFAULT_COMPONENTS = ["vector_memory", "agent", "memory", "plan_manager"]
+
+_warm_up_started: Optional[float] = None
+_warm_up_seconds: Optional[float] = None
+
+
+def warm_up(names: Optional[List[str]] = None, max_workers: Optional[int] = None) -> Dict:
+    """
+    以執行緒池平行建立延遲單例。彼此有依賴的元件會在 LazyProxy 的鎖上等待，不會重複建立。
+    Args:
+        names (Optional[List[str]]): 要預熱的元件名稱，預設為 STARTUP_WARM_UP 環境變數或 DEFAULT_COMPONENTS
+        max_workers (Optional[int]): 執行緒數
+    Returns:
+        Dict: 與 readiness() 相同格式的就緒狀態
+    """
+    global _warm_up_started, _warm_up_seconds
+    if names is None:
+        env_names = os.getenv("STARTUP_WARM_UP")
+        names = [n.strip() for n in env_names.split(",") if n.strip()] if env_names else DEFAULT_COMPONENTS
+
+    components = registered()
+    targets = [components[n] for n in names if n in components]
+    _warm_up_started = time.perf_counter()
+
+    def build(component):
+        try:
+            component.get()
+        except Exception as e:
+            print(f"[Startup] 初始化 {component._name} 失敗：{e}")
+
+    with ThreadPoolExecutor(max_workers=max_workers or max(len(targets), 1)) as pool:
+        list(pool.map(build, targets))
+
+    _warm_up_seconds = time.perf_counter() - _warm_up_started
+    print(f"[Startup] 預熱完成（{_warm_up_seconds:.2f}s）")
+    return readiness()
+
+
+def readiness() -> Dict:
+    """
+    回傳各元件的就緒狀態；所有已宣告的元件都建立完成才算 ready。
+    """
+    components = {name: proxy.status() for name, proxy in registered().items()}
+    return {
+        "ready": all(c["ready"] for c in components.values()),
+        "warm_up_seconds": None if _warm_up_seconds is None else round(_warm_up_seconds, 3),
+        "components": components
+    }
@@ -7,7 +7,9 @@ from langchain.memory import ConversationSummaryBufferMemory
 from langchain_openai import ChatOpenAI
 from agent.singleton_memory import vector_memory_instance
 from dotenv import load_dotenv
+from typing import List
 import os
+import threading
 
 
 class SummaryMemory:
@@ -25,6 +27,14 @@ class SummaryMemory:
         )
         self.last_saved_summary = ""  # 狀態追蹤避免重複儲存
 
+        # 向量索引方式：messages 只送出新增的對話訊息；summary 只送出滾動摘要
+        self.index_mode = os.getenv("SUMMARY_INDEX_MODE", "messages").lower()
+        # 已寫入向量記憶的訊息水位（以累計訊息數計，不受摘要裁切 chat_memory 影響）
+        self.message_count = 0
+        self.indexed_count = 0
+        self._pending_texts: List[str] = []
+        self._lock = threading.Lock()
+
     def add_user_message(self, message: str):
         """
         添加使用者訊息到記憶。
@@ -32,6 +42,7 @@ class SummaryMemory:
             message (str): 使用者發送的訊息
         """
         self.memory.chat_memory.add_user_message(message)
+        self._track(message)
 
     def add_ai_message(self, message: str):
         """
@@ -40,6 +51,13 @@ class SummaryMemory:
             message (str): AI 發送的回應訊息
         """
         self.memory.chat_memory.add_ai_message(message)
+        self._track(message)
+
+    def _track(self, message: str):
+        with self._lock:
+            self.message_count += 1
+            if message:
+                self._pending_texts.append(message)
 
     def get_summary(self) -> str:
         """
@@ -50,17 +68,51 @@ class SummaryMemory:
         if not self.memory.chat_memory.messages:
             return ""
 
+        with self._lock:
+            # 只取出上次寫入後新增的訊息，已寫入的不再重送
+            pending = self._pending_texts
+            self._pending_texts = []
+            watermark = self.message_count
+        has_new = watermark > self.indexed_count
+
+        if has_new and self.index_mode == "summary":
+            # 訊息直接加入 chat_memory 不會觸發裁切，這裡手動裁切以產生滾動摘要
+            self.memory.prune()
+
         summary = self.memory.load_memory_variables({})["history"]
-        if summary and summary != self.last_saved_summary:
-            raw_history = self.memory.chat_memory.messages
-            flat_texts = [msg.content for msg in raw_history if hasattr(msg, "content")]
+        if has_new:
+            if self.index_mode == "summary":
+                # 只保存滾動摘要（尚未超過 max_token_limit 時摘要為空字串）
+                rolled_up = self.memory.moving_summary_buffer
+                texts = [rolled_up] if rolled_up and rolled_up != self.last_saved_summary else []
+            else:
+                texts = pending
 
-            if flat_texts:
-                self.vector_memory.add_memory(flat_texts)
-                self.last_saved_summary = summary
+            try:
+                if texts:
+                    self.vector_memory.add_memory(texts)  # 一次批次計算 embedding
+            except Exception:
+                with self._lock:
+                    self._pending_texts = pending + self._pending_texts  # 失敗時保留，下次再送
+                raise
+            self.indexed_count = watermark
+            if self.index_mode == "summary" and texts:
+                self.last_saved_summary = texts[0]
 
         return summary
 
+    def index_stats(self) -> dict:
+        """
+        回傳向量索引水位（累計訊息數、已寫入數、待寫入數）。
+        """
+        with self._lock:
+            return {
+                "mode": self.index_mode,
+                "messages": self.message_count,
+                "indexed": self.indexed_count,
+                "pending": len(self._pending_texts)
+            }
+
     def query_summaries(self, query: str, top_k: int = 5):
         """
         查詢與對話摘要相關的記憶。
@@ -71,3 +123,9 @@ class SummaryMemory:
             List[Dict]: 返回最相似摘要的列表
         """
         return self.vector_memory.query_memory(query, top_k=top_k)
+
+    async def aquery_summaries(self, query: str, top_k: int = 5):
+        """
+        query_summaries 的非同步版本。
+        """
+        return await self.vector_memory.aquery_memory(query, top_k=top_k)
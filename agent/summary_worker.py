@@ -0,0 +1,141 @@
+# agent/summary_worker.py
+
+import atexit
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class SummaryWorker:
+    """
+    在背景執行緒中更新對話摘要並寫入向量記憶，讓 Agent 回應不必等待摘要 LLM 與 embedding。
+
+    request() 只記錄一次需求；同一段時間內的多次需求會合併（debounce）成一次 get_summary()，
+    最後一次需求後 debounce 秒執行，最久不超過第一次需求後 max_delay 秒。
+    """
+
+    def __init__(self, summary_memory, debounce: Optional[float] = None, max_delay: Optional[float] = None):
+        """
+        Args:
+            summary_memory (SummaryMemory): 要更新的摘要記憶
+            debounce (Optional[float]): 最後一次需求後等待的秒數
+            max_delay (Optional[float]): 第一次需求後最多等待的秒數
+        """
+        self.summary_memory = summary_memory
+        self.debounce = debounce if debounce is not None else float(os.getenv("SUMMARY_DEBOUNCE_SECONDS", 2.0))
+        self.max_delay = max_delay if max_delay is not None else float(os.getenv("SUMMARY_MAX_DELAY_SECONDS", 10.0))
+
+        self._cond = threading.Condition()
+        self._pending = 0                        # 尚未處理的需求數（佇列深度）
+        self._first_request: Optional[float] = None
+        self._last_request: Optional[float] = None
+        self._running = False
+        self._force = False                      # flush() 要求立即處理
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.passes = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.last_duration = 0.0
+        atexit.register(self.close)
+
+    def request(self) -> None:
+        """
+        要求更新摘要（立即返回）。
+        """
+        with self._cond:
+            if self._closed:
+                return
+            now = time.monotonic()
+            if self._pending == 0:
+                self._first_request = now
+            self._pending += 1
+            self._last_request = now
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="summary-worker", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        立即處理所有待處理的需求，並等待完成。
+        Returns:
+            bool: 是否在 timeout 內處理完畢
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._pending:
+                self._force = True
+                self._cond.notify()
+            while self._pending or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        self.flush(timeout=30)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """
+        回傳佇列深度與延遲（lag：需求發出到摘要寫入完成的時間）。
+        """
+        with self._cond:
+            oldest = time.monotonic() - self._first_request if self._pending else 0.0
+            return {
+                "queue_depth": self._pending,
+                "running": self._running,
+                "oldest_pending_seconds": round(oldest, 3),
+                "last_lag_seconds": round(self.last_lag, 3),
+                "last_duration_seconds": round(self.last_duration, 3),
+                "passes": self.passes,
+                "coalesced_requests": self.coalesced,
+                "errors": self.errors
+            }
+
+    # ------------------- 內部方法 -------------------
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if self._pending:
+                        now = time.monotonic()
+                        due = min(self._last_request + self.debounce, self._first_request + self.max_delay)
+                        if self._force or now >= due:
+                            break
+                        self._cond.wait(due - now)
+                    else:
+                        self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+
+                batch = self._pending
+                first_request = self._first_request
+                self._pending = 0
+                self._first_request = self._last_request = None
+                self._force = False
+                self._running = True
+
+            start = time.monotonic()
+            try:
+                self.summary_memory.get_summary()
+            except Exception as e:
+                self.errors += 1
+                print(f"[SummaryWorker] 摘要更新失敗：{e}")
+            finally:
+                end = time.monotonic()
+                with self._cond:
+                    self._running = False
+                    self.passes += 1
+                    self.coalesced += batch - 1
+                    self.last_duration = end - start
+                    self.last_lag = end - first_request
+                    self._cond.notify_all()
@@ -0,0 +1,88 @@
+# agent/task_group.py
+
+import asyncio
+import os
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+
+class KeyedTaskGroup:
+    """
+    在同一個事件迴圈中執行協程：整體同時執行數量有上限，同一個 key（例如同一隻寵物）的工作
+    依送出順序逐一執行，不同 key 之間則可並行。
+
+    等待中的工作只是一個尚未開始的 asyncio.Task，不會佔用執行緒或另外建立事件迴圈。
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        """
+        Args:
+            max_concurrency (Optional[int]): 同時執行的工作上限，預設讀取 AGENT_MAX_CONCURRENCY
+        """
+        self.max_concurrency = max_concurrency or int(os.getenv("AGENT_MAX_CONCURRENCY", 8))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tails: Dict[str, asyncio.Task] = {}   # 每個 key 最後送出的工作
+        self._tasks: Set[asyncio.Task] = set()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, key: str, factory: Callable[[], Awaitable]) -> asyncio.Task:
+        """
+        送出一個工作（需在事件迴圈中呼叫）。
+        Args:
+            key (str): 排序用的鍵，相同 key 的工作依序執行
+            factory (Callable[[], Awaitable]): 輪到執行時才呼叫以建立協程
+        Returns:
+            asyncio.Task: 工作本身，可 await 取得結果
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        previous = self._tails.get(key)
+        task = asyncio.create_task(self._run(previous, factory))
+        self._tails[key] = task
+        self._tasks.add(task)
+        task.add_done_callback(lambda t: self._on_done(key, t))
+        return task
+
+    async def join(self):
+        """
+        等待目前所有工作完成。
+        """
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": len(self._tasks),
+            "running": self.running,
+            "waiting": len(self._tasks) - self.running,
+            "keys": len(self._tails),
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+    # ------------------- 內部方法 -------------------
+
+    async def _run(self, previous: Optional[asyncio.Task], factory: Callable[[], Awaitable]):
+        if previous is not None:
+            # 只等待前一個工作結束，不論成功或失敗
+            await asyncio.wait([previous])
+        async with self._semaphore:
+            self.running += 1
+            try:
+                return await factory()
+            finally:
+                self.running -= 1
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._tails.get(key) is task:
+            del self._tails[key]
+        if task.cancelled() or task.exception() is not None:
+            self.failed += 1
+            if not task.cancelled():
+                print(f"[TaskGroup] {key} 工作失敗：{task.exception()}")
+        else:
+            self.completed += 1
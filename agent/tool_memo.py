@@ -0,0 +1,92 @@
+# agent/tool_memo.py
+
+import asyncio
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+
+class ToolMemo:
+    """
+    單次 Agent 執行內的工具結果快取。
+
+    - 唯讀工具：相同 (工具, 參數) 只執行一次，同時送出的相同呼叫共用同一個 Task
+    - 有副作用的工具：依序執行（不與其他副作用工具並行），執行後清空快取，
+      之後的查詢會重新取得最新狀態
+    """
+
+    def __init__(self):
+        self._results: Dict[str, asyncio.Task] = {}
+        self._side_effect_lock = asyncio.Lock()
+
+    async def read(self, key: str, factory: Callable[[], Awaitable[str]]) -> str:
+        task = self._results.get(key)
+        if task is not None:
+            memo_stats.hits += 1
+        else:
+            memo_stats.misses += 1
+            task = asyncio.ensure_future(factory())
+            self._results[key] = task
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            # 失敗的結果不保留，下次呼叫重新執行
+            if self._results.get(key) is task:
+                del self._results[key]
+            raise
+
+    async def write(self, factory: Callable[[], Awaitable[str]]) -> str:
+        async with self._side_effect_lock:
+            memo_stats.side_effects += 1
+            try:
+                return await factory()
+            finally:
+                if self._results:
+                    memo_stats.invalidations += 1
+                self._results.clear()
+
+
+class MemoStats:
+    def __init__(self):
+        self.runs = 0
+        self.hits = 0
+        self.misses = 0
+        self.side_effects = 0
+        self.invalidations = 0
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "runs": self.runs,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "side_effects": self.side_effects,
+            "invalidations": self.invalidations
+        }
+
+
+memo_stats = MemoStats()
+_current_memo: ContextVar[Optional[ToolMemo]] = ContextVar("tool_memo", default=None)
+
+
+@contextmanager
+def tool_run_scope():
+    """
+    在 with 區塊內（包含其中建立的 Task）呼叫的工具共用同一個 ToolMemo。
+    """
+    token = _current_memo.set(ToolMemo())
+    memo_stats.runs += 1
+    try:
+        yield
+    finally:
+        _current_memo.reset(token)
+
+
+def current_memo() -> Optional[ToolMemo]:
+    return _current_memo.get()
+
+
+def memo_key(name: str, args: tuple, kwargs: Dict[str, Any]) -> str:
+    return json.dumps([name, args, kwargs], ensure_ascii=False, sort_keys=True, default=str)
@@ -1,10 +1,11 @@
-from typing import Optional, Dict
+import inspect
+from typing import Optional, Dict, Callable, Awaitable
 
 from agent.context import global_state
 from agent.memory_manager import memory
 from agent.singleton_memory import vector_memory_instance
-from agent.summary_memory import SummaryMemory
 from agent.singleton_plan import plan_manager_instance as plan_manager
+from agent.tool_memo import current_memo, memo_key
 import json
 
 def check_current_state(_: Optional[str] = None) -> str:
@@ -31,7 +32,7 @@ def switch_status(new_status: str) -> str:
     return f"已將狀態切換為 {new_status}"
 
 
-def check_temp(self) -> str:
+def check_temp(_: Optional[str] = None) -> str:
     """
     確認目前的室內溫度。
 
@@ -133,8 +134,26 @@ def search_summary_memory(query: str) -> str:
     Returns:
         str: 匹配的摘要內容（文字格式）
     """
-    sm = SummaryMemory()
-    results = sm.query_summaries(query)
+    # 共用 MemoryManager 的摘要記憶，查詢結果快取也與其他查詢共用
+    results = memory.summary_memory.query_summaries(query)
+    if not results:
+        return "找不到相關摘要記憶。"
+    return "\n".join([f"[距離: {r['distance']:.4f}] {r['text']}" for r in results])
+
+async def asearch_vector_memory(query: str) -> str:
+    """
+    search_vector_memory 的非同步版本（等待 embedding API 時不佔用執行緒）。
+    """
+    results = await vector_memory_instance.aquery_memory(query)
+    if not results:
+        return "找不到相關記憶。"
+    return "\n".join([f"[距離: {r['distance']:.4f}] {r['text']}" for r in results])
+
+async def asearch_summary_memory(query: str) -> str:
+    """
+    search_summary_memory 的非同步版本。
+    """
+    results = await memory.summary_memory.aquery_summaries(query)
     if not results:
         return "找不到相關摘要記憶。"
     return "\n".join([f"[距離: {r['distance']:.4f}] {r['text']}" for r in results])
@@ -266,3 +285,54 @@ def get_toolkit():
         get_today_plan,
         wait_and_observe
     ]
+
+# 需要等待外部 API 的工具提供原生非同步版本
+ASYNC_TOOLS = {
+    search_vector_memory: asearch_vector_memory,
+    search_summary_memory: asearch_summary_memory,
+}
+
+# 只讀取狀態、不改變環境的工具；同一次執行內結果可重用，也可以並行呼叫。
+# 其餘工具（切換狀態、調整冷氣、餵食、通知、記錄、新增計畫）視為有副作用。
+READ_ONLY_TOOLS = {
+    check_current_state,
+    check_temp,
+    search_vector_memory,
+    search_summary_memory,
+    check_daily_plan_conflict,
+    get_today_plan,
+    wait_and_observe,
+}
+
+def is_read_only(tool: Callable[..., str]) -> bool:
+    return tool in READ_ONLY_TOOLS
+
+def get_async_tool(tool: Callable[..., str]) -> Callable[..., Awaitable[str]]:
+    """
+    取得工具的非同步版本。沒有原生版本的工具只讀寫記憶體或小型 JSON 檔，
+    直接在事件迴圈中執行，不必為每次呼叫切換到執行緒池。
+    在 tool_run_scope() 內呼叫時，唯讀工具的結果會在同一次執行內重用，有副作用的工具則會使快取失效。
+    """
+    if tool in ASYNC_TOOLS:
+        base = ASYNC_TOOLS[tool]
+    else:
+        async def base(*args, **kwargs) -> str:
+            return tool(*args, **kwargs)
+
+    read_only = is_read_only(tool)
+    # 只有佔位參數（_）的工具不論輸入為何結果都相同，例如 ReAct 常傳入「無」
+    params = list(inspect.signature(tool).parameters)
+    ignore_args = params == ["_"]
+
+    async def run(*args, **kwargs) -> str:
+        memo = current_memo()
+        if memo is None:
+            return await base(*args, **kwargs)
+        if read_only:
+            key = memo_key(tool.__name__, () if ignore_args else args, {} if ignore_args else kwargs)
+            return await memo.read(key, lambda: base(*args, **kwargs))
+        return await memo.write(lambda: base(*args, **kwargs))
+
+    run.__name__ = tool.__name__
+    run.__doc__ = tool.__doc__
+    return run
@@ -1,8 +1,7 @@
 # utils.py
 
 import json
-from typing import Dict
-from pathlib import Path
+from typing import Dict, List
 
 
 def load_input_json(path: str) -> Dict:
@@ -25,37 +24,37 @@ def get_latest_data(input_data: list, last_processed_time: str):
     new_data.sort(key=lambda x: x["time"])
     return new_data
 
-def store_agent_response(response: Dict, output_path: str) -> None:
+def compact_logs(logs: List[Dict]) -> List[Dict]:
     """
-    將 Agent 的回應儲存為 JSON 檔。
+    將連續且 (行為, 地點) 相同的 observation 合併為一個區段。
 
     Args:
-      response (Dict): Agent 回傳的字典資料。
-      output_path (str): 儲存檔案的路徑。
+      logs (List[Dict]): 依時間排序的 observation
+
+    Returns:
+      List[Dict]: 區段列表，每個區段含 start、end、action、地點、count
+    """
+    spans = []
+    for log in logs:
+        action = log.get("action")
+        place = log.get("地點", "未知")
+        last = spans[-1] if spans else None
+        if last and last["action"] == action and last["地點"] == place:
+            last["end"] = log["time"]
+            last["count"] += 1
+        else:
+            spans.append({"start": log["time"], "end": log["time"], "action": action, "地點": place, "count": 1})
+    return spans
+
+def format_log_spans(spans: List[Dict]) -> str:
+    """
+    將 compact_logs 的區段轉為摘要 prompt 使用的文字，一個區段一行。
     """
-    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-
-    # 檢查 JSON 檔案是否存在
-    if Path(output_path).exists():
-        # 若存在，先讀取檔案內的資料
-        with open(output_path, 'r', encoding='utf-8') as f:
-            try:
-                existing_data = json.load(f)
-                print(f"[exit data]: {existing_data}")
-            except json.JSONDecodeError:
-                # 如果解析失敗，可能檔案內並無合法 JSON 格式內容
-                existing_data = []
-    else:
-        existing_data = []
-
-    # 假設我們的 JSON 檔案儲存的是一個 list
-    if not isinstance(existing_data, list):
-        # 若不是 list，可依需求將其轉換或另作處理
-        existing_data = [existing_data]
-
-    # 追加新的資料
-    existing_data.append(response)
-
-    # 寫入更新後的資料到 JSON 檔案（採用覆蓋模式）
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(existing_data, f, ensure_ascii=False, indent=2)
+    lines = []
+    for span in spans:
+        if span["count"] == 1:
+            lines.append(f"時間：{span['start']}，行為：{span['action']}，地點：{span['地點']}")
+        else:
+            lines.append(f"時間：{span['start']}～{span['end']}，行為：{span['action']}，地點：{span['地點']}"
+                         f"（連續 {span['count']} 筆）")
+    return "\n".join(lines)
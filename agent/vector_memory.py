@@ -1,15 +1,24 @@
 # vector_memory.py
+import asyncio
 import time
 
 import faiss # faiss_cpu
+import numpy as np
 import os
-from langchain_openai import OpenAIEmbeddings
+import threading
+import uuid
+from collections import OrderedDict
 from langchain_community.vectorstores import FAISS
-from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain.schema import Document
+from agent.sqlite_docstore import SqliteDocstore, content_hash
+from agent.embedding_cache import CachedEmbeddings
+from agent.embeddings import get_embedding_provider
+from agent.ann_index import (load_index_config, index_type_of, build_index, apply_search_params,
+                             ensure_id_lookup, add_vectors, get_vectors, removes_in_place, search_params,
+                             min_train_size)
 
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import List, Dict, Tuple
 
 # 載入環境變數
 load_dotenv()
@@ -23,27 +32,67 @@ class VectorMemory:
             vector_store_path (str): FAISS 向量資料庫的存儲路徑
         """
 
-        embedding_key = os.getenv("OPENAI_EMBEDDING_KEY")
-        embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
-        self.embeddings = OpenAIEmbeddings(model=embedding_model, api_key=embedding_key)
+        # embedding 來源由 EMBEDDING_PROVIDER 決定（openai / local），維度由來源推得
+        provider, embedding_model, self.dimension = get_embedding_provider()
+        # 重複的查詢（例如同樣的 observation）直接由快取取得向量，不再呼叫 API
+        self.embeddings = CachedEmbeddings(
+            provider,
+            model=embedding_model,
+            dimension=self.dimension,
+            cache_path=os.path.join(os.path.dirname(vector_store_path), "embedding_cache.db")
+        )
 
         # 嘗試載入現有的 FAISS 資料庫
         self.vector_store_path = vector_store_path
         self.vector_store = None
+        # index.faiss 以 memory-mapping 載入，文件內容與內容雜湊存在 docstore.db（SQLite）
+        self.index_path = os.path.join(vector_store_path, "index.faiss")
+        self.docstore_path = os.path.join(vector_store_path, "docstore.db")
+        self._index_mapped = False
+
+        # 查詢結果快取：key 為 (query, top_k, version)，資料異動時 version 加一使舊結果失效
+        self.version = 0
+        self.query_cache_size = int(os.getenv("QUERY_CACHE_SIZE", 512))
+        self._query_cache: "OrderedDict[tuple, List[Dict]]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
 
-        allow_dangerous = os.getenv("ALLOW_DANGEROUS_DESERIALIZATION", "False").lower() == "true"
-        if (os.path.exists(self.vector_store_path)
-                and os.path.isfile(os.path.join(self.vector_store_path, "index.faiss"))):
+        # 索引類型設定（flat / hnsw / ivf / auto），資料量變大時於背景改建為 ANN 索引
+        self.index_config = load_index_config()
+        # _index_lock 只保護索引本身的讀寫，不得在持有期間呼叫 embedding API 或寫檔；
+        # _save_lock 讓寫檔依序進行（取快照時才短暫持有 _index_lock）
+        self._index_lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._migration_thread = None
+        self._delete_generation = 0
+        # 已刪除、尚待背景重建回收的位置，查詢時以 _search_params 過濾
+        self._tombstones = set()
+        self._search_params = None
+
+        legacy_path = os.path.join(self.vector_store_path, "index.pkl")
+        if os.path.isfile(self.index_path) and os.path.isfile(self.docstore_path):
             # 如果資料庫存在，載入它
             try:
-                self.vector_store = FAISS.load_local(self.vector_store_path, self.embeddings,
-                                                     allow_dangerous_deserialization=allow_dangerous)
+                self._load_store()
                 print("資料庫載入成功")
+                if self.vector_store.index.d != self.dimension or not self._index_consistent():
+                    self._reembed_all()
+                self._maybe_migrate()
             except Exception as e:
                 print(f"載入資料庫時出錯: {e}")
                 # 如果載入失敗，強制初始化
                 self.initialize_vector_store()
 
+        elif os.path.isfile(self.index_path) and os.path.isfile(legacy_path):
+            # 舊版 pickle 格式，轉換一次後改用新格式
+            try:
+                allow_dangerous = os.getenv("ALLOW_DANGEROUS_DESERIALIZATION", "False").lower() == "true"
+                self._migrate_legacy_store(legacy_path, allow_dangerous)
+            except Exception as e:
+                print(f"轉換舊版資料庫時出錯: {e}")
+                self.initialize_vector_store()
+
         else:
             # 如果沒有資料庫，初始化一個新的 FAISS 資料庫
             self.initialize_vector_store()
@@ -54,27 +103,30 @@ class VectorMemory:
         """
         初始化一個新的 FAISS 向量資料庫。
         """
-        dim = 1536
-        index = faiss.IndexFlatL2(dim)  # L2 距離度量
-        # 創建一個空的文檔存儲
-        docstore = InMemoryDocstore()
-        # 創建索引到文檔 ID 的映射
-        index_to_docstore_id = {}
+        if self.index_config["index_type"] == "hnsw":
+            # HNSW 不需訓練，可直接從空索引開始
+            index = build_index("hnsw", self.dimension, config=self.index_config)
+        else:
+            index = faiss.IndexFlatL2(self.dimension)  # L2 距離度量
+        # 創建一個空的文檔存儲（SQLite），並沿用其索引位置對應表
+        docstore = SqliteDocstore(self.docstore_path)
+        docstore.clear()
 
         # 使用 LangChain 內部的 FAISS 來創建向量資料庫
         self.vector_store = FAISS(
             embedding_function=self.embeddings,
             index=index,
             docstore=docstore,
-            index_to_docstore_id=index_to_docstore_id
+            index_to_docstore_id=docstore.positions
         )
+        self._index_mapped = False
+        self._refresh_tombstones()
+        self._bump_version()
         self.save()
         print(f"[確認] 資料夾 {self.vector_store_path} 目前內容：")
         for f in os.listdir(self.vector_store_path):
             print(" -", f)
 
-        time.sleep(1)  # 保險起見給它一點緩衝
-
     def add_memory(self, texts: List[str]) -> None:
         """
         儲存新的記憶到 FAISS 向量資料庫。
@@ -84,29 +136,36 @@ class VectorMemory:
         print("[Debug] 儲存路徑絕對位置：", os.path.abspath(self.vector_store_path))
         print("[AddMemory] 接收到文本：", texts)
 
-        if self.vector_store.index.ntotal == 0:
-
-            existing_texts = set()
-            print("[AddMemory] 向量索引為空，無既有內容")
-        else:
-            # 避免完全重複的記憶內容加入
-            existing_docs = self.vector_store.similarity_search("", k=100)
-            existing_texts = set(doc.page_content for doc in existing_docs)
-            print(f"[AddMemory] 現有記憶數量：{len(existing_texts)}")
-
-        new_texts = [t for t in texts if t not in existing_texts]
+        # 以內容雜湊判斷是否已存在（不需呼叫 embedding API），同批重複的文本也只保留一份
+        hashes = [content_hash(t) for t in texts]
+        seen = self.vector_store.docstore.existing_hashes(hashes)
+        new_texts = []
+        for t, h in zip(texts, hashes):
+            if h in seen:
+                continue
+            seen.add(h)
+            new_texts.append(t)
+        print(f"[AddMemory] 現有記憶數量：{self.vector_store.index.ntotal}")
 
         # 將文本轉換為向量並儲存
         if new_texts:
             print(f"[AddMemory] 準備加入 {len(new_texts)} 則新記憶")
-            # 包裝成 Document 格式（才能正確儲存到 docstore）
-            documents = [Document(page_content=t) for t in new_texts]
+            # 先在鎖外計算向量（呼叫 embedding API），持有鎖時只做索引與 docstore 的寫入
+            vectors = self.embeddings.embed_documents(new_texts)
+            ids = [str(uuid.uuid4()) for _ in new_texts]
 
-            self.vector_store.add_documents(documents)
-            self.vector_store.save_local(self.vector_store_path)  # 儲存索引檔案
-            # 儲存資料庫
+            with self._index_lock:
+                # 計算向量期間可能已有相同內容寫入
+                existing = self.vector_store.docstore.existing_hashes([content_hash(t) for t in new_texts])
+                pairs = [(t, v, i) for t, v, i in zip(new_texts, vectors, ids) if content_hash(t) not in existing]
+                if pairs:
+                    self._ensure_index_writable()
+                    self._add_embeddings_locked(pairs)
+                    self._bump_version()
+            # 儲存索引檔案（docstore 已在新增時寫入）
             self.save()
-            print(f"[AddMemory] 已儲存 {len(documents)} 則記憶到向量資料庫")
+            print(f"[AddMemory] 已儲存 {len(pairs)} 則記憶到向量資料庫")
+            self._maybe_migrate()
         else:
             print("[AddMemory] 無新文本需儲存，略過。")
 
@@ -114,14 +173,23 @@ class VectorMemory:
         for f in os.listdir(self.vector_store_path):
             print(" -", f)
 
-        self.vector_store.save_local(self.vector_store_path)
-
         print(f"[AddMemory] 儲存後 index 數量：{self.vector_store.index.ntotal}")
         print(f"[AddMemory] 資料應儲存在：{os.path.abspath(self.vector_store_path)}")
         print(f"[AddMemory] 資料夾內容：{os.listdir(self.vector_store_path)}")
 
         time.sleep(1)  # 保險起見給它一點緩衝
 
+    def _add_embeddings_locked(self, pairs: List[Tuple[str, List[float], str]]):
+        """
+        將 (文本, 向量, id) 加入索引與 docstore，新位置接在目前位置（含墓碑）之後。
+        呼叫端需持有 _index_lock。
+        """
+        positions = self.vector_store.index_to_docstore_id
+        start = len(positions)
+        add_vectors(self.vector_store.index, np.asarray([v for _, v, _ in pairs], dtype="float32"), start)
+        self.vector_store.docstore.add({i: Document(page_content=t) for t, _, i in pairs})
+        positions.update({start + j: i for j, (_, _, i) in enumerate(pairs)})
+
     def query_memory(self, query: str, top_k: int = 5) -> List[Dict]:
         """
         根據查詢文本來查找最相似的記憶。
@@ -131,19 +199,344 @@ class VectorMemory:
         Returns:
             List[Dict]: 返回的最相似記憶，格式為字典列表
         """
-        # 查詢最相似的文本
-        result = self.vector_store.similarity_search_with_score(query, top_k=top_k)
+        # 與批次查詢共用快取與流程：embedding 在鎖外計算，持有索引鎖時只做 index.search
+        return self.query_memory_batch([query], top_k=top_k)[0]
+
+    def query_memory_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        一次查詢多個文本：未命中快取的查詢只呼叫一次 embedding API，
+        並以堆疊後的矩陣執行單次 index.search。
+        Args:
+            queries (List[str]): 查詢的文本列表
+            top_k (int): 每個查詢返回的最相似記憶數量
+        Returns:
+            List[List[Dict]]: 與 queries 順序對應的查詢結果
+        """
+        results, pending = self._lookup_query_cache(queries, top_k)
+        if pending:
+            vectors = self.embeddings.embed_documents(pending)
+            self._search_and_cache(pending, vectors, top_k, results)
+        return [list(results[q]) for q in queries]
+
+    async def aquery_memory_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        query_memory_batch 的非同步版本：等待 embedding API 時不佔用執行緒。
+        """
+        results, pending = self._lookup_query_cache(queries, top_k)
+        if pending:
+            vectors = await self.embeddings.aembed_documents(pending)
+            # 索引鎖可能正被背景執行緒（新增、刪除、遷移）持有，搜尋改在執行緒池中進行，不阻塞事件迴圈
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._search_and_cache, pending, vectors, top_k, results
+            )
+        return [list(results[q]) for q in queries]
+
+    async def aquery_memory(self, query: str, top_k: int = 5) -> List[Dict]:
+        """
+        query_memory 的非同步版本，與同步查詢共用查詢快取。
+        """
+        return (await self.aquery_memory_batch([query], top_k=top_k))[0]
+
+    def _lookup_query_cache(self, queries: List[str], top_k: int):
+        """
+        Returns:
+            (Dict[str, List[Dict]], List[str]): 已命中快取的結果，以及需要查詢的文本（不重複）
+        """
+        results: Dict[str, List[Dict]] = {}
+        pending = []
+        with self._query_cache_lock:
+            for query in dict.fromkeys(queries):
+                cached = self._query_cache.get((query, top_k, self.version))
+                if cached is not None:
+                    self._query_cache.move_to_end((query, top_k, self.version))
+                    self.query_cache_hits += 1
+                    results[query] = cached
+                else:
+                    self.query_cache_misses += 1
+                    pending.append(query)
+        return results, pending
+
+    def _search_and_cache(self, pending: List[str], vectors, top_k: int, results: Dict[str, List[Dict]]):
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._index_lock:
+            version = self.version
+            distances, positions = self.vector_store.index.search(vectors, top_k, params=self._search_params)
+            index_to_id = self.vector_store.index_to_docstore_id
+            docstore = self.vector_store.docstore
+            for query, dist_row, pos_row in zip(pending, distances, positions):
+                items = []
+                for distance, pos in zip(dist_row, pos_row):
+                    doc_id = index_to_id.get(int(pos)) if pos != -1 else None
+                    if doc_id is None:
+                        continue  # 資料量少於 top_k，或位置已刪除
+                    doc = docstore.search(doc_id)
+                    items.append({"distance": float(distance), "text": doc.page_content})
+                results[query] = items
+
+        with self._query_cache_lock:
+            for query in pending:
+                self._query_cache[(query, top_k, version)] = results[query]
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def query_cache_stats(self) -> Dict:
+        with self._query_cache_lock:
+            total = self.query_cache_hits + self.query_cache_misses
+            return {
+                "version": self.version,
+                "hits": self.query_cache_hits,
+                "misses": self.query_cache_misses,
+                "hit_rate": round(self.query_cache_hits / total, 4) if total else 0.0,
+                "entries": len(self._query_cache)
+            }
+
+    def _bump_version(self):
+        """
+        資料異動後遞增版本，並清掉舊版本的查詢快取。
+        """
+        with self._query_cache_lock:
+            self.version += 1
+            self._query_cache.clear()
+
+    def find_ids(self, text: str) -> List[str]:
+        """
+        找出內容完全相同的記憶 id。
+        """
+        return self.vector_store.docstore.ids_by_hash(content_hash(text))
+
+    def list_memories(self) -> List[Tuple[str, str]]:
+        """
+        依索引位置列出所有記憶的 (id, 內容)。
+        """
+        return [(doc_id, doc.page_content) for doc_id, doc in self.vector_store.docstore.iter_documents()]
+
+    def delete_memory(self, ids: List[str]) -> int:
+        """
+        依 id 直接從 FAISS 索引與 docstore 移除記憶，不需重新計算任何向量，也不重建索引：
+        flat 以 remove_ids 移除並重新編號位置；IVF 依 id 移除、位置不變；
+        HNSW 只記錄墓碑並在查詢時過濾，墓碑累積到一定比例後由背景執行緒重建回收。
+        Args:
+            ids (List[str]): 要刪除的 docstore id
+        Returns:
+            int: 實際刪除的筆數
+        """
+        with self._index_lock:
+            docstore = self.vector_store.docstore
+            positions = docstore.positions_of(ids)
+            if not positions:
+                return 0
 
-        # 組裝查詢結果
-        results = [{"distance": score, "text": doc.page_content} for doc, score in result]
-        return results
+            index = self.vector_store.index
+            kind = index_type_of(index)
+            if removes_in_place(index):
+                self._ensure_index_writable()
+                self.vector_store.index.remove_ids(np.array(positions, dtype="int64"))
+            # IndexFlat.remove_ids 會把後面的向量往前遞補，與 docstore 的位置重新編號一致；
+            # 其他索引的位置不變，刪除的位置記為墓碑
+            docstore.delete(ids, compact=kind == "flat")
+            self._refresh_tombstones()
+
+            self._delete_generation += 1
+            self._bump_version()
+        if removes_in_place(index):
+            self.save()
+        print(f"[DeleteMemory] 已刪除 {len(positions)} 則記憶，待回收位置 {len(self._tombstones)} 個")
+        self._maybe_migrate()
+        return len(positions)
+
+    def _refresh_tombstones(self):
+        """
+        重新讀取墓碑位置並建立查詢過濾參數。呼叫端需持有 _index_lock（或在初始化時呼叫）。
+        """
+        self._tombstones = set(self.vector_store.docstore.tombstones())
+        self._search_params = search_params(self.vector_store.index, self._tombstones)
+
+    def _index_consistent(self) -> bool:
+        """
+        索引中的向量數是否與 docstore 的位置一致（IVF 已移除墓碑位置的向量）。
+        """
+        expected = len(self.vector_store.index_to_docstore_id)
+        if index_type_of(self.vector_store.index) == "ivf":
+            expected -= len(self._tombstones)
+        return self.vector_store.index.ntotal == expected
+
+    def _reembed_all(self):
+        """
+        既有索引的維度與目前 embedding 來源不同（例如切換 provider）時，
+        以新的 embedding 重新建立整個資料庫。
+        """
+        texts = [text for _, text in self.list_memories()]
+        print(f"[VectorMemory] 索引（維度 {self.vector_store.index.d}，{self.vector_store.index.ntotal} 筆）"
+              f"與 embedding 維度 {self.dimension} 或文件數不一致，重新計算 {len(texts)} 則記憶")
+        self.initialize_vector_store()
+        if texts:
+            self.add_memory(texts)
+
+    def index_stats(self) -> Dict:
+        with self._index_lock:
+            return {
+                "type": index_type_of(self.vector_store.index),
+                "target_type": self._target_index_type(),
+                "ntotal": self.vector_store.index.ntotal,
+                "tombstones": len(self._tombstones),
+                "migrating": bool(self._migration_thread and self._migration_thread.is_alive())
+            }
+
+    def _target_index_type(self) -> str:
+        index_type = self.index_config["index_type"]
+        if index_type == "auto":
+            return self.index_config["ann_type"]
+        return index_type
+
+    def _load_store(self):
+        """
+        以 memory-mapping 載入 index.faiss，文件內容則在查詢時才從 docstore.db 讀取，
+        啟動時間不隨記憶數量增加。
+        """
+        mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+        index = faiss.read_index(self.index_path, mmap_flag)
+        self._index_mapped = bool(mmap_flag)
+        apply_search_params(index, self.index_config)
+        ensure_id_lookup(index)
+
+        docstore = SqliteDocstore(self.docstore_path)
+        self.vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=docstore.positions
+        )
+        self._refresh_tombstones()
+
+    def _ensure_index_writable(self):
+        """
+        memory-mapped 的索引是唯讀的，第一次寫入前先複製到記憶體中。
+        """
+        if self._index_mapped:
+            index = faiss.deserialize_index(faiss.serialize_index(self.vector_store.index))
+            apply_search_params(index, self.index_config)
+            ensure_id_lookup(index)
+            self.vector_store.index = index
+            self._search_params = search_params(index, self._tombstones)
+            self._index_mapped = False
+
+    def _migrate_legacy_store(self, legacy_path: str, allow_dangerous: bool):
+        """
+        將舊版 FAISS.save_local 的 pickle 格式（index.pkl）轉換為 docstore.db。
+        """
+        legacy = FAISS.load_local(self.vector_store_path, self.embeddings,
+                                  allow_dangerous_deserialization=allow_dangerous)
+        docstore = SqliteDocstore(self.docstore_path)
+        docstore.clear()
+        mapping = dict(legacy.index_to_docstore_id)
+        documents = {}
+        for _, doc_id in sorted(mapping.items()):
+            doc = legacy.docstore.search(doc_id)
+            documents[doc_id] = doc if isinstance(doc, Document) else Document(page_content=str(doc))
+        docstore.add(documents)
+        docstore.positions.update(mapping)
+
+        apply_search_params(legacy.index, self.index_config)
+        self.vector_store = FAISS(
+            embedding_function=self.embeddings,
+            index=legacy.index,
+            docstore=docstore,
+            index_to_docstore_id=docstore.positions
+        )
+        self._refresh_tombstones()
+        self.save()
+
+        os.replace(legacy_path, legacy_path + ".bak")
+        hash_path = os.path.join(self.vector_store_path, "content_hashes.json")
+        if os.path.isfile(hash_path):
+            os.remove(hash_path)  # 內容雜湊已改存於 docstore.db
+        print(f"[VectorMemory] 已將舊版資料庫轉換為新格式，共 {len(mapping)} 筆")
+
+    def _maybe_migrate(self):
+        """
+        於背景執行緒重建索引：資料量達門檻時將 flat 索引改建為設定的 ANN 索引，
+        或 HNSW 的墓碑超過 VECTOR_COMPACT_RATIO 時重建以回收刪除的位置。
+        """
+        target = self._target_index_type()
+        with self._index_lock:
+            current = index_type_of(self.vector_store.index)
+            ntotal = len(self.vector_store.index_to_docstore_id) - len(self._tombstones)
+            compact = (current == "hnsw" and self._tombstones
+                       and len(self._tombstones) > self.index_config["compact_ratio"] * self.vector_store.index.ntotal)
+        if self._migration_thread and self._migration_thread.is_alive():
+            return
+
+        if compact:
+            target = current
+        else:
+            if target == "flat" or current == target:
+                return
+            if self.index_config["index_type"] == "auto" and ntotal < self.index_config["threshold"]:
+                return
+            if ntotal < max(min_train_size(target, self.index_config), 1):
+                return
+
+        self._migration_thread = threading.Thread(target=self._migrate_index, args=(target,), daemon=True)
+        self._migration_thread.start()
+
+    def _migrate_index(self, target: str):
+        start = time.perf_counter()
+        with self._index_lock:
+            old_index = self.vector_store.index
+            n = len(self.vector_store.index_to_docstore_id)
+            generation = self._delete_generation
+            tombstones = set(self._tombstones)
+            keep = [pos for pos in range(n) if pos not in tombstones]
+            vectors = get_vectors(old_index, keep)
+
+        # 訓練與建立索引不持有鎖，期間仍可正常查詢與新增；新索引不含墓碑，位置依序重新編號
+        try:
+            new_index = build_index(target, self.dimension, vectors, self.index_config)
+        except Exception as e:
+            print(f"[VectorMemory] 建立 {target} 索引失敗：{e}")
+            return
+
+        with self._index_lock:
+            if self.vector_store.index is not old_index or generation != self._delete_generation:
+                # 期間有刪除或重建，向量位置已改變，等下次新增或刪除時再重試
+                print("[VectorMemory] 索引在遷移期間已變動，放棄本次遷移")
+                return
+            added = list(range(n, len(self.vector_store.index_to_docstore_id)))
+            if added:
+                add_vectors(new_index, get_vectors(old_index, added), len(keep))
+            self.vector_store.index = new_index
+            self._index_mapped = False
+            if tombstones:
+                self.vector_store.docstore.compact_tombstones()
+            self._refresh_tombstones()
+            self._bump_version()
+        self.save()
+
+        print(f"[VectorMemory] 已將索引由 {index_type_of(old_index)} 重建為 {target}，"
+              f"共 {new_index.ntotal} 筆（回收 {len(tombstones)} 個刪除位置），"
+              f"耗時 {time.perf_counter() - start:.2f}s")
+
+    def contains(self, text: str) -> bool:
+        """
+        判斷內容是否已存入向量資料庫（以內容雜湊查詢，不需呼叫 embedding API）。
+        """
+        return bool(self.find_ids(text))
 
     def save(self):
         """
         保存資料庫
         """
         if self.vector_store:
-            self.vector_store.save_local(self.vector_store_path)
+            # 呼叫端不可持有 _index_lock（鎖的順序固定為 _save_lock -> _index_lock）
+            with self._save_lock:
+                with self._index_lock:
+                    # 持有索引鎖時只序列化成記憶體中的快照，寫檔在鎖外進行
+                    data = faiss.serialize_index(self.vector_store.index)
+                # 先寫入暫存檔再取代：目前載入中的 memory-mapped 檔案不會被覆寫
+                os.makedirs(self.vector_store_path, exist_ok=True)
+                tmp_path = self.index_path + ".tmp"
+                data.tofile(tmp_path)
+                os.replace(tmp_path, self.index_path)
             print("資料庫已儲存")
         else:
             print("未初始化資料庫")
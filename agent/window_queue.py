@@ -0,0 +1,183 @@
+# agent/window_queue.py
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from agent.task_group import KeyedTaskGroup
+
+OVERFLOW_POLICIES = ("block", "coalesce", "drop_oldest")
+
+
+class Window:
+    """
+    一個待推理的時間視窗。
+    """
+
+    def __init__(self, key: str, logs: List[Dict], current_time: str):
+        self.key = key
+        self.logs = logs
+        self.current_time = current_time
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self.merged = 1          # 合併了幾個視窗
+        self.dropped = False
+        self.released = False
+
+
+class WindowQueue:
+    """
+    有上限的視窗工作佇列。
+
+    已送出但尚未完成的視窗（等待中 + 執行中）最多 max_pending 個，超過時依 overflow 策略處理：
+    - block：等待有視窗完成後才放入（回壓到 log 監控迴圈）
+    - coalesce：與同一隻寵物尚未開始的最後一個視窗合併（沒有可合併的視窗時改為等待）
+    - drop_oldest：捨棄最早的尚未開始視窗（全部都在執行中時改為等待）
+    實際執行交給 KeyedTaskGroup：同時執行數有上限，同一隻寵物的視窗依序處理。
+    """
+
+    def __init__(self, process: Callable[[List[Dict], str], Awaitable], max_pending: Optional[int] = None,
+                 overflow: Optional[str] = None, max_concurrency: Optional[int] = None,
+                 on_drop: Optional[Callable[[List[Dict], str], None]] = None):
+        """
+        Args:
+            process (Callable): 處理視窗的協程函式 process(logs, current_time)
+            max_pending (Optional[int]): 未完成視窗的上限，預設讀取 WINDOW_QUEUE_MAX
+            overflow (Optional[str]): block / coalesce / drop_oldest，預設讀取 WINDOW_OVERFLOW_POLICY
+            max_concurrency (Optional[int]): 同時執行的視窗數，預設讀取 AGENT_MAX_CONCURRENCY
+            on_drop (Optional[Callable]): 視窗被 drop_oldest 捨棄時呼叫 on_drop(logs, current_time)
+        """
+        self.process = process
+        self.on_drop = on_drop
+        self.max_pending = max_pending or int(os.getenv("WINDOW_QUEUE_MAX", 16))
+        self.overflow = (overflow or os.getenv("WINDOW_OVERFLOW_POLICY", "block")).lower()
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的 WINDOW_OVERFLOW_POLICY：{self.overflow}")
+
+        self.tasks = KeyedTaskGroup(max_concurrency)
+        self._waiting: Deque[Window] = deque()      # 尚未開始的視窗（依送出順序）
+        self._in_flight = 0
+        self._space: Optional[asyncio.Condition] = None
+
+        self.submitted = 0
+        self.completed = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.blocked_seconds = 0.0
+        self.max_depth = 0
+        self._timings: Deque[Dict] = deque(maxlen=int(os.getenv("WINDOW_TIMING_HISTORY", 200)))
+
+    async def put(self, key: str, logs: List[Dict], current_time: str) -> None:
+        """
+        送出一個視窗；佇列已滿時依 overflow 策略處理。
+        """
+        if self._space is None:
+            self._space = asyncio.Condition()
+
+        self.submitted += 1
+        if self._in_flight >= self.max_pending:
+            if self.overflow == "coalesce" and self._coalesce(key, logs, current_time):
+                return
+            if not (self.overflow == "drop_oldest" and self._drop_oldest()):
+                start = time.monotonic()
+                async with self._space:
+                    await self._space.wait_for(lambda: self._in_flight < self.max_pending)
+                self.blocked_seconds += time.monotonic() - start
+
+        window = Window(key, logs, current_time)
+        self._waiting.append(window)
+        self._in_flight += 1
+        self.max_depth = max(self.max_depth, self._in_flight)
+        self.tasks.submit(key, lambda: self._run(window))
+
+    async def join(self):
+        await self.tasks.join()
+
+    def stats(self) -> Dict:
+        """
+        回傳佇列深度與各視窗的等待 / 處理時間（最近 WINDOW_TIMING_HISTORY 筆）。
+        """
+        return {
+            "overflow": self.overflow,
+            "max_pending": self.max_pending,
+            "depth": self._in_flight,
+            "waiting": len(self._waiting),
+            "max_depth": self.max_depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "blocked_seconds": round(self.blocked_seconds, 3),
+            "queue_wait_ms": _percentiles([t["queue_wait_ms"] for t in self._timings]),
+            "process_ms": _percentiles([t["process_ms"] for t in self._timings]),
+            "recent": list(self._timings)[-10:],
+            "tasks": self.tasks.stats()
+        }
+
+    # ------------------- 內部方法 -------------------
+
+    async def _run(self, window: Window):
+        if window.dropped:
+            return None
+        window.started_at = time.monotonic()
+        self._waiting.remove(window)
+        try:
+            return await self.process(window.logs, window.current_time)
+        finally:
+            end = time.monotonic()
+            self.completed += 1
+            self._timings.append({
+                "key": window.key,
+                "time": window.current_time,
+                "logs": len(window.logs),
+                "merged": window.merged,
+                "queue_wait_ms": round((window.started_at - window.enqueued_at) * 1000, 2),
+                "process_ms": round((end - window.started_at) * 1000, 2)
+            })
+            await self._release(window)
+
+    def _coalesce(self, key: str, logs: List[Dict], current_time: str) -> bool:
+        # 同一隻寵物尚未開始的最後一個視窗就是緊鄰的前一個視窗
+        for window in reversed(self._waiting):
+            if window.key == key:
+                window.logs = window.logs + logs
+                window.current_time = current_time
+                window.merged += 1
+                self.coalesced += 1
+                return True
+        return False
+
+    def _drop_oldest(self) -> bool:
+        if not self._waiting:
+            return False
+        window = self._waiting.popleft()
+        window.dropped = True
+        self.dropped += 1
+        print(f"[WindowQueue] 佇列已滿，捨棄 {window.key} {window.current_time} 的視窗")
+        if self.on_drop:
+            self.on_drop(window.logs, window.current_time)
+        # 視窗的 task 仍會在輪到時直接結束，這裡先釋放名額
+        self._in_flight -= 1
+        window.released = True
+        return True
+
+    async def _release(self, window: Window):
+        if window.released:
+            return
+        window.released = True
+        self._in_flight -= 1
+        async with self._space:
+            self._space.notify_all()
+
+
+def _percentiles(values: List[float]) -> Dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(values)
+    return {
+        "p50": ordered[int(0.5 * (len(ordered) - 1))],
+        "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        "max": ordered[-1]
+    }
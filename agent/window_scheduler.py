@@ -0,0 +1,205 @@
+# agent/window_scheduler.py
+
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from agent.checkpoint import CheckpointStore, observation_id
+from agent.log_tailer import LogTailer
+
+TIME_FORMAT = "%Y%m%d%H%M%S"
+
+
+class WindowScheduler:
+    """
+    依資料水位（log 中最新的時間）排程時間視窗。
+
+    視窗的結束時間不超過水位時即視為完整，可以立即處理；落後時一次產生所有已完整的視窗，
+    沒有資料的視窗直接跳到下一筆 log 所在的視窗。追上水位後以 os.stat 輪詢等待 log 檔變動，
+    不再以固定間隔推進模擬時間。
+
+    視窗為左開右閉區間 (start, end]，邊界上的 observation 只屬於一個視窗。
+    提供 CheckpointStore 時，已處理的 observation 會被略過，並持久化「最早尚未處理完的視窗」
+    作為重新啟動時的起點。處理失敗的視窗延遲後重新送出，重試期間仍算處理中，起點不會越過它。
+    """
+
+    def __init__(self, tailer: LogTailer, start_time: Optional[str] = None,
+                 window_minutes: Optional[int] = None, poll_interval: Optional[float] = None,
+                 checkpoint: Optional[CheckpointStore] = None, max_attempts: Optional[int] = None,
+                 retry_delay: Optional[float] = None):
+        """
+        Args:
+            tailer (LogTailer): log 來源
+            start_time (Optional[str]): 第一個視窗的起始時間（%Y%m%d%H%M%S），預設讀取 WINDOW_START_TIME
+            window_minutes (Optional[int]): 視窗長度（分鐘），預設讀取 WINDOW_MINUTES
+            poll_interval (Optional[float]): 等待新資料時檢查檔案的間隔秒數，預設讀取 LOG_POLL_INTERVAL
+            checkpoint (Optional[CheckpointStore]): 已處理紀錄與水位的儲存位置
+            max_attempts (Optional[int]): 每個視窗最多處理幾次（含第一次），預設讀取 WINDOW_MAX_ATTEMPTS
+            retry_delay (Optional[float]): 失敗後重新送出前等待的秒數，預設讀取 WINDOW_RETRY_DELAY
+        """
+        self.tailer = tailer
+        self.checkpoint = checkpoint
+        resume_from = checkpoint.get("resume_from") if checkpoint else None
+        if resume_from:
+            print(f"[Scheduler] 從檢查點 {resume_from} 繼續")
+        start_time = resume_from or start_time or os.getenv("WINDOW_START_TIME", "20250429120000")
+        self.next_start = datetime.strptime(start_time, TIME_FORMAT)
+        self.window = timedelta(minutes=window_minutes or int(os.getenv("WINDOW_MINUTES", 5)))
+        # 起點之前的 log 不會再用到，緩衝區可以淘汰
+        self.tailer.release(start_time)
+        self.poll_interval = poll_interval or float(os.getenv("LOG_POLL_INTERVAL", 1.0))
+        self.max_attempts = max_attempts or int(os.getenv("WINDOW_MAX_ATTEMPTS", 3))
+        self.retry_delay = retry_delay if retry_delay is not None else float(os.getenv("WINDOW_RETRY_DELAY", 5.0))
+
+        self.emitted = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.retried = 0
+        self.abandoned = 0
+        # 已送出但尚未處理完的 observation（ID -> 時間）
+        self._inflight: Dict[str, str] = {}
+        # 等待重試的視窗：(可重試的時間, end, logs)，以及各 observation 已處理失敗的次數
+        self._retry: Deque[Tuple[float, str, List[Dict]]] = deque()
+        self._attempts: Dict[str, int] = {}
+
+    def ready_windows(self) -> Iterator[Tuple[str, str, List[Dict]]]:
+        """
+        依序產生所有已完整的視窗 (start, end, logs)。
+        取用下一個視窗時才推進，呼叫端可在兩個視窗之間等待（例如佇列已滿時）。
+        已到重試時間的失敗視窗會先送出。
+        """
+        while self._retry and self._retry[0][0] <= time.monotonic():
+            _, end_str, logs = self._retry.popleft()
+            start = datetime.strptime(end_str, TIME_FORMAT) - self.window
+            self.retried += 1
+            yield start.strftime(TIME_FORMAT), end_str, logs
+
+        while True:
+            watermark = self.tailer.latest_time
+            end = self.next_start + self.window
+            start_str = self.next_start.strftime(TIME_FORMAT)
+            end_str = end.strftime(TIME_FORMAT)
+            if watermark is None or end_str > watermark:
+                return
+
+            logs = self.tailer.window(start_str, end_str, include_start=False)
+            if not logs:
+                # 跳過沒有資料的視窗，直接移到下一筆 log 所在的視窗
+                next_time = self.tailer.next_time_after(start_str)
+                gap = datetime.strptime(next_time, TIME_FORMAT) - self.next_start
+                skip = max(1, gap // self.window)
+                self.next_start += self.window * skip
+                self.skipped += skip
+                self.tailer.release(self.next_start.strftime(TIME_FORMAT))
+                continue
+
+            self.next_start = end
+            # 視窗的 log 已取出，緩衝區中 time <= end 的紀錄可以淘汰
+            self.tailer.release(end_str)
+            if self.checkpoint:
+                fresh = self.checkpoint.filter_unprocessed(logs)
+                self.duplicates += len(logs) - len(fresh)
+                logs = fresh
+                for log in logs:
+                    self._inflight[observation_id(log)] = log["time"]
+                self._save_resume_point()
+            if not logs:
+                continue  # 整個視窗在中斷前已處理過
+
+            self.emitted += 1
+            yield start_str, end_str, logs
+
+    def settle(self, logs: List[Dict], processed: bool = True) -> None:
+        """
+        視窗處理完成（或被捨棄，processed=False）後呼叫，更新已處理紀錄與重新啟動的起點。
+        """
+        if not self.checkpoint:
+            return
+        if processed:
+            self.checkpoint.mark_processed(logs)
+        for log in logs:
+            self._inflight.pop(observation_id(log), None)
+        self._save_resume_point()
+
+    @contextmanager
+    def processing(self, logs: List[Dict], current_time: str):
+        """
+        包住一個視窗的處理：
+        - 正常結束：記為已處理
+        - 拋出 Exception：保留在處理中清單並排入重試（起點停在此視窗）；
+          達到 max_attempts 次後才記為未處理並放棄，避免重新啟動的起點與處理紀錄的清理永遠卡住
+        - 被取消（例如關閉伺服器）：保留在處理中清單，重新啟動後從此視窗繼續
+        Args:
+            logs (List[Dict]): 視窗中的 observation
+            current_time (str): 視窗的結束時間
+        """
+        try:
+            yield
+        except Exception as e:
+            self._fail(logs, current_time, e)
+            raise
+        for log in logs:
+            self._attempts.pop(observation_id(log), None)
+        self.settle(logs)
+
+    def _fail(self, logs: List[Dict], current_time: str, error: Exception):
+        ids = [observation_id(log) for log in logs]
+        attempts = max(self._attempts.get(i, 0) for i in ids) + 1 if ids else self.max_attempts
+        if attempts >= self.max_attempts:
+            print(f"[Scheduler] 視窗 {current_time} 已失敗 {attempts} 次，放棄處理：{error}")
+            for i in ids:
+                self._attempts.pop(i, None)
+            self.abandoned += 1
+            self.settle(logs, processed=False)
+            return
+        print(f"[Scheduler] 視窗 {current_time} 第 {attempts} 次處理失敗，{self.retry_delay:g} 秒後重試：{error}")
+        for i in ids:
+            self._attempts[i] = attempts
+        self._retry.append((time.monotonic() + self.retry_delay, current_time, logs))
+
+    def _save_resume_point(self):
+        """
+        起點為最早尚未處理完的 observation 所在的視窗；全部處理完時為下一個視窗。
+        """
+        if self._inflight:
+            oldest = datetime.strptime(min(self._inflight.values()), TIME_FORMAT)
+            steps = (self.next_start - oldest) // self.window + 1
+            resume = self.next_start - self.window * steps
+        else:
+            resume = self.next_start
+        resume_str = resume.strftime(TIME_FORMAT)
+        if resume_str != self.checkpoint.get("resume_from"):
+            self.checkpoint.set("resume_from", resume_str)
+            # 起點之前的 observation 不會再被讀到，處理紀錄可以刪除
+            self.checkpoint.prune(resume_str)
+
+    async def wait_for_data(self):
+        """
+        等待 log 檔變動（或有失敗的視窗到了重試時間）。
+        """
+        while not self.tailer.has_changed():
+            if self._retry and self._retry[0][0] <= time.monotonic():
+                return  # 有失敗的視窗到了重試時間
+            await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict:
+        watermark = self.tailer.latest_time
+        behind = 0.0
+        if watermark:
+            behind = max(0.0, (datetime.strptime(watermark, TIME_FORMAT) - self.next_start).total_seconds())
+        return {
+            "next_window_start": self.next_start.strftime(TIME_FORMAT),
+            "watermark": watermark,
+            "behind_seconds": behind,
+            "windows_emitted": self.emitted,
+            "windows_skipped": self.skipped,
+            "duplicates_skipped": self.duplicates,
+            "windows_retried": self.retried,
+            "windows_abandoned": self.abandoned,
+            "retry_pending": len(self._retry),
+            "inflight_observations": len(self._inflight)
+        }
@@ -0,0 +1,111 @@
+# bench_agent_engine.py
+# 比較 react 與 tool_calling 兩種 Agent 引擎：每筆 observation 的 LLM 呼叫次數、token 數與端到端延遲
+#
+# 用法：python apiTest/bench_agent_engine.py --engines react,tool_calling --repeat 2
+#       python apiTest/bench_agent_engine.py --input ../input/log.json --limit 20
+# 需要 OPENAI_CHAT_KEY（實際呼叫模型）。每個引擎在新的 Python 行程與暫存目錄中執行，
+# 並關閉日常基準分流與決策快取，確保每筆 observation 都完整經過 Agent。
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+SAMPLE_OBSERVATIONS = [
+    {"time": "20250429120500", "action": "吠叫", "地點": "門口"},
+    {"time": "20250429121000", "action": "來回踱步", "地點": "客廳"},
+    {"time": "20250429121500", "action": "喘氣", "地點": "客廳"},
+    {"time": "20250429122000", "action": "在碗前徘徊", "地點": "餐廳"},
+    {"time": "20250429122500", "action": "睡覺", "地點": "臥室"},
+]
+
+# 在子行程中執行：依序處理 observation，以 get_openai_callback 計算 LLM 呼叫次數與 token
+RUN_SCRIPT = """
+import asyncio, builtins, json, sys, time
+from langchain_community.callbacks import get_openai_callback
+observations = json.loads(sys.stdin.read())
+_write = sys.stdout.write
+builtins.print = lambda *a, **k: None
+from agent.agent_core import PetCareAgent
+agent = PetCareAgent()
+
+async def main():
+    results = []
+    for obs in observations:
+        with get_openai_callback() as cb:
+            start = time.perf_counter()
+            response = await agent.run(obs)
+            elapsed = time.perf_counter() - start
+        results.append({"llm_calls": cb.successful_requests, "tokens": cb.total_tokens, "seconds": elapsed,
+                        "output": response["agent_response"]})
+    return results
+
+results = asyncio.run(main())
+_write(json.dumps({"results": results, "budget": agent.budget_counters.stats()}, ensure_ascii=False) + "\\n")
+"""
+
+
+def run_engine(engine: str, observations):
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp) / "run"
+        workdir.mkdir()
+        env = {**os.environ, "PYTHONPATH": str(REPO_ROOT), "AGENT_ENGINE": engine,
+               "BASELINE_TRIAGE": "0", "DECISION_CACHE_TTL": "0"}
+        proc = subprocess.run(
+            [sys.executable, "-c", RUN_SCRIPT], cwd=workdir, capture_output=True, text=True, env=env,
+            input=json.dumps(observations, ensure_ascii=False)
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "執行失敗")
+        return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def summarize(engine: str, report):
+    results = report["results"]
+    calls = [r["llm_calls"] for r in results]
+    tokens = [r["tokens"] for r in results]
+    seconds = [r["seconds"] for r in results]
+    exhausted = sum(report["budget"]["exhausted"].values())
+    print(f"{engine:>12} {len(results):>5} {statistics.mean(calls):>10.2f} {statistics.mean(tokens):>10.0f} "
+          f"{percentile(seconds, 0.5):>8.2f} {percentile(seconds, 0.95):>8.2f} {max(seconds):>8.2f} {exhausted:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", default="react,tool_calling")
+    parser.add_argument("--input", help="observation 的 JSON 檔（列表），預設使用內建範例")
+    parser.add_argument("--limit", type=int, default=0, help="只取前 N 筆 observation")
+    parser.add_argument("--repeat", type=int, default=1, help="每筆 observation 重複的次數")
+    args = parser.parse_args()
+
+    if not os.getenv("OPENAI_CHAT_KEY"):
+        sys.exit("需要設定 OPENAI_CHAT_KEY")
+
+    observations = SAMPLE_OBSERVATIONS
+    if args.input:
+        with open(args.input, "r", encoding="utf-8") as f:
+            observations = json.load(f)
+    if args.limit:
+        observations = observations[:args.limit]
+    observations = observations * args.repeat
+
+    print(f"observations={len(observations)} model={os.getenv('OPENAI_CHAT_MODEL', 'gpt-4o-mini')}")
+    print(f"{'engine':>12} {'obs':>5} {'llm_calls':>10} {'tokens':>10} {'p50(s)':>8} {'p95(s)':>8} "
+          f"{'max(s)':>8} {'fallback':>9}")
+    for engine in args.engines.split(","):
+        summarize(engine, run_engine(engine, observations))
+
+
+if __name__ == "__main__":
+    main()
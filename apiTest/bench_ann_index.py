@@ -0,0 +1,86 @@
+# bench_ann_index.py
+# 比較 flat / hnsw / ivf 索引的 recall@k 與查詢延遲（p50 / p99）
+#
+# 用法：python apiTest/bench_ann_index.py --sizes 10000,100000,1000000 --dim 256
+# 參數（efSearch、nprobe 等）沿用 VECTOR_* 環境變數，與 VectorMemory 實際使用的設定相同。
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from agent.ann_index import build_index, load_index_config  # noqa: E402
+
+
+def make_data(n: int, dim: int, n_queries: int, seed: int = 0):
+    """
+    產生分群的隨機向量（比均勻亂數更接近實際 embedding 的分布）。
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = max(16, n // 1000)
+    centers = rng.normal(size=(n_clusters, dim)).astype("float32")
+    labels = rng.integers(0, n_clusters, size=n)
+    data = centers[labels] + 0.3 * rng.normal(size=(n, dim)).astype("float32")
+    q_labels = rng.integers(0, n_clusters, size=n_queries)
+    queries = centers[q_labels] + 0.3 * rng.normal(size=(n_queries, dim)).astype("float32")
+    return data.astype("float32"), queries.astype("float32")
+
+
+def measure(index, queries: np.ndarray, k: int):
+    latencies = []
+    results = np.empty((len(queries), k), dtype="int64")
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(q.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+        results[i] = ids[0]
+    latencies = np.array(latencies) * 1000
+    return results, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def recall_at_k(results: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(r) & set(t)) for r, t in zip(results, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", default="flat,hnsw,ivf")
+    args = parser.parse_args()
+
+    config = load_index_config()
+    types = args.types.split(",")
+    print(f"設定：dim={args.dim} k={args.k} queries={args.queries} "
+          f"efSearch={config['ef_search']} M={config['hnsw_m']} nprobe={config['nprobe']}")
+    print(f"{'size':>9} {'type':>5} {'build(s)':>9} {'recall@k':>9} {'p50(ms)':>8} {'p99(ms)':>8}")
+
+    for n in [int(x) for x in args.sizes.split(",")]:
+        data, queries = make_data(n, args.dim, args.queries)
+
+        flat = build_index("flat", args.dim, data, config)
+        truth, flat_p50, flat_p99 = measure(flat, queries, args.k)
+
+        for index_type in types:
+            if index_type == "flat":
+                print(f"{n:>9} {'flat':>5} {'-':>9} {1.0:>9.4f} {flat_p50:>8.3f} {flat_p99:>8.3f}")
+                continue
+            start = time.perf_counter()
+            index = build_index(index_type, args.dim, data, config)
+            build_seconds = time.perf_counter() - start
+            results, p50, p99 = measure(index, queries, args.k)
+            print(f"{n:>9} {index_type:>5} {build_seconds:>9.2f} "
+                  f"{recall_at_k(results, truth):>9.4f} {p50:>8.3f} {p99:>8.3f}")
+            del index
+
+        del flat, data
+
+
+if __name__ == "__main__":
+    main()
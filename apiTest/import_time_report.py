@@ -0,0 +1,78 @@
+# import_time_report.py
+# 量測 import agent.server 的時間，以及之後預熱（agent.startup.warm_up）所需的時間
+#
+# 用法：python apiTest/import_time_report.py --runs 5
+#       python apiTest/import_time_report.py --baseline /path/to/old_checkout   # 與舊版比較
+# 每次量測都在新的 Python 行程與暫存目錄中執行（../memory 會建立在暫存目錄內，不影響實際資料）。
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+# 在子行程中執行：先量 import，若有 agent.startup 再量預熱
+MEASURE_SCRIPT = """
+import builtins, json, time
+start = time.perf_counter()
+import agent.server
+import_seconds = time.perf_counter() - start
+builtins.print = lambda *a, **k: None
+warm_up_seconds = None
+try:
+    from agent.startup import warm_up
+except ImportError:
+    pass
+else:
+    start = time.perf_counter()
+    warm_up()
+    warm_up_seconds = time.perf_counter() - start
+import sys
+sys.stdout.write(json.dumps({"import": import_seconds, "warm_up": warm_up_seconds}) + "\\n")
+"""
+
+
+def measure(repo: Path, runs: int):
+    results = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(tmp) / "run"
+            workdir.mkdir()
+            proc = subprocess.run(
+                [sys.executable, "-c", MEASURE_SCRIPT], cwd=workdir, capture_output=True, text=True,
+                env={**os.environ, "PYTHONPATH": str(repo)}
+            )
+            if proc.returncode != 0:
+                raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "量測失敗")
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def summarize(name: str, results):
+    imports = [r["import"] for r in results]
+    line = f"{name:>10} import median={statistics.median(imports):.3f}s min={min(imports):.3f}s"
+    warm = [r["warm_up"] for r in results if r["warm_up"] is not None]
+    if warm:
+        line += f" | warm_up median={statistics.median(warm):.3f}s"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", help="舊版程式碼的路徑（例如 git worktree add 出來的目錄）")
+    args = parser.parse_args()
+
+    print(f"runs={args.runs}（新建的記憶資料夾，無既有向量資料）")
+    if args.baseline:
+        summarize("baseline", measure(Path(args.baseline).resolve(), args.runs))
+    summarize("current", measure(REPO_ROOT, args.runs))
+
+
+if __name__ == "__main__":
+    main()
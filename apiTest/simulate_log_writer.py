@@ -5,34 +5,42 @@ import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
-log_path = "../input/log.json"
+# 副檔名為 .jsonl 時改用逐行追加（server 可只讀取新增部分）；舊的 .json 陣列格式每次都要重寫整個檔案
+log_path = "../input/log.jsonl"
+append_mode = log_path.endswith(".jsonl")
 
 # 初始化起始時間
 time_cursor = datetime.strptime("20250429120000", "%Y%m%d%H%M%S")
 
-# 確保 log.json 存在
+# 確保 log 檔存在
 if not Path(log_path).exists():
     with open(log_path, "w", encoding="utf-8") as f:
-        json.dump([], f, ensure_ascii=False, indent=2)
+        if not append_mode:
+            json.dump([], f, ensure_ascii=False, indent=2)
 
 while True:
-    # 每次新增一筆 observation
-    with open(log_path, "r", encoding="utf-8") as f:
-        logs = json.load(f)
-
     new_entry = {
         "time": time_cursor.strftime("%Y%m%d%H%M%S"),
         "action": "休息",
         "地點": "客廳"
     }
-    logs.append(new_entry)
 
-    with open(log_path, "w", encoding="utf-8") as f:
-        json.dump(logs, f, ensure_ascii=False, indent=2)
+    if append_mode:
+        with open(log_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(new_entry, ensure_ascii=False) + "\n")
+    else:
+        # 每次新增一筆 observation
+        with open(log_path, "r", encoding="utf-8") as f:
+            logs = json.load(f)
+
+        logs.append(new_entry)
+
+        with open(log_path, "w", encoding="utf-8") as f:
+            json.dump(logs, f, ensure_ascii=False, indent=2)
 
     print(f"新增一筆 observation: {new_entry}")
 
     # 時間往後推5秒
     time_cursor += timedelta(seconds=5)
 
-    time.sleep(0.1)
\ No newline at end of file
+    time.sleep(0.1)
@@ -1,29 +1,34 @@
 # main.py
 
-import time
+import asyncio
 from agent.agent_core import PetCareAgent
-from agent.utils import load_input_json, get_latest_data, store_agent_response
+from agent.log_tailer import LogTailer
+from agent.response_log import ResponseLog
 
-def main():
+async def main():
     input_path = "./input/sample.json"
-    output_path = "./output/response.json"
+    output_path = "./output/response.jsonl"
     last_processed_time = "20250000000000"
 
     agent = PetCareAgent()
+    tailer = LogTailer(input_path)
+    response_log = ResponseLog(output_path)
 
     while True:
-        input_data = load_input_json(input_path)
-        new_data = get_latest_data(input_data, last_processed_time)
+        tailer.poll()
+        new_data = tailer.after(last_processed_time)
 
         if new_data:
             for data in new_data:
-                result = agent.run(data)
-                store_agent_response(result, output_path)
+                result = await agent.run(data)
+                response_log.append(result, data["time"])
                 last_processed_time = data["time"]
-            time.sleep(3)
+            # 已處理的 log 可以從緩衝區淘汰
+            tailer.release(last_processed_time)
+            await asyncio.sleep(3)
         else:
             print("[Main] 暫無新資料，等待中...")
-            time.sleep(3)
+            await asyncio.sleep(3)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+# tests/test_behavior_baseline.py
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from agent.behavior_baseline import TIME_FORMAT, BehaviorBaseline
+from agent.event_store import EventStore
+
+
+def make_baseline():
+    return BehaviorBaseline(min_events=20, min_probability=0.05, duration_z=3.0, min_duration_samples=3,
+                            span_gap_seconds=600, min_hour_events=5)
+
+
+def daily_events(days=5):
+    """
+    每天 12:00 起在臥室睡覺 30 分鐘（每 5 分鐘一筆），13:00 在餐廳吃飯一次。
+    """
+    events = []
+    start = datetime(2025, 4, 20)
+    for day in range(days):
+        base = start + timedelta(days=day, hours=12)
+        for i in range(7):
+            events.append({"time": (base + timedelta(minutes=5 * i)).strftime(TIME_FORMAT),
+                           "action": "睡覺", "地點": "臥室"})
+        events.append({"time": (base + timedelta(hours=1)).strftime(TIME_FORMAT), "action": "吃飯", "地點": "餐廳"})
+    return events
+
+
+def observation(time_str, action="睡覺", place="臥室"):
+    return {"time": time_str, "action": action, "地點": place}
+
+
+def test_scores_usual_rare_and_unknown_behaviors():
+    baseline = make_baseline()
+    baseline.build(daily_events())
+
+    assert baseline.score(observation("20250430120500"))["reason"] == "符合日常基準"
+    assert baseline.score(observation("20250430120500", "吃飯", "臥室"))["reason"] == "此時段少見的行為"
+    assert baseline.score(observation("20250430120500", "嘔吐", "臥室"))["reason"] == "未曾出現的行為或地點"
+    assert baseline.score(observation("20250430030000"))["reason"] == "此時段資料不足"
+    assert baseline.score(observation("模擬時間"))["reason"] == "無法解析時間"
+
+
+def test_too_few_events_are_always_unusual():
+    baseline = make_baseline()
+    baseline.build(daily_events(days=1))
+
+    assert baseline.score(observation("20250430120500"))["reason"] == "基準資料不足"
+
+
+def test_long_ongoing_span_is_unusual():
+    baseline = make_baseline()
+    events = daily_events()
+    baseline.build(events)
+    # 最後一天的睡覺區段延長到兩小時
+    last = datetime.strptime(events[-1]["time"], TIME_FORMAT)
+    t = last
+    for _ in range(24):
+        t += timedelta(minutes=5)
+        baseline.observe(observation(t.strftime(TIME_FORMAT)))
+
+    result = baseline.score(observation((t + timedelta(minutes=5)).strftime(TIME_FORMAT)))
+
+    assert result["reason"] == "持續時間過長"
+    assert result["duration_z"] > 3.0
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "baseline.npz")
+    baseline = make_baseline()
+    baseline.build(daily_events())
+    baseline.save(path, last_event_id=40)
+
+    restored = make_baseline()
+
+    assert restored.load(path) == 40
+    assert restored.stats() == {**baseline.stats(), "scored": 0, "unusual": 0, "usual": 0, "reasons": {}}
+    probe = observation("20250430120500")
+    assert restored.score(probe) == baseline.score(probe)
+
+
+def test_resume_after_load_matches_full_replay(tmp_path):
+    path = str(tmp_path / "baseline.npz")
+    events = daily_events()
+    split = 19  # 在睡覺區段的中間存檔，未結束的區段也要一起保存
+
+    full = make_baseline()
+    full.build(events)
+
+    partial = make_baseline()
+    partial.build(events[:split])
+    partial.save(path, last_event_id=split)
+    resumed = make_baseline()
+    last_id = resumed.load(path)
+    resumed.build(events[last_id:])
+
+    for name in ("counts", "hour_totals", "duration_n", "duration_mean", "duration_m2"):
+        np.testing.assert_allclose(getattr(resumed, name), getattr(full, name))
+    for probe in (observation("20250430120500"), observation("20250430130000", "吃飯", "餐廳")):
+        assert resumed.score(probe) == full.score(probe)
+
+
+def test_missing_or_corrupt_file_requires_full_replay(tmp_path):
+    baseline = make_baseline()
+    assert baseline.load(str(tmp_path / "missing.npz")) == 0
+
+    corrupt = tmp_path / "corrupt.npz"
+    corrupt.write_bytes(b"not a npz file")
+    assert baseline.load(str(corrupt)) == 0
+    assert baseline.stats()["events"] == 0
+
+
+def record(store, events, normal=True):
+    for event in events:
+        store.append({"trigger": event, "action": "無行動", "effectiveness": "待觀察", "normal": normal})
+
+
+def test_resume_from_event_store_learns_only_normal_events(tmp_path):
+    path = str(tmp_path / "baseline.npz")
+    events = daily_events()
+    store = EventStore(str(tmp_path / "events.db"))
+    record(store, events[:20])
+    record(store, [observation("20250422120700", "嘔吐", "臥室")], normal=False)
+
+    # 與 MemoryManager 相同：只重播正常事件，存檔時記下涵蓋到的事件 ID
+    baseline = make_baseline()
+    baseline.build(trigger for _, trigger in store.iter_normal_triggers())
+    baseline.save(path, store.last_id())
+    record(store, events[20:])
+    store.close()
+
+    reopened = EventStore(str(tmp_path / "events.db"))
+    resumed = make_baseline()
+    resumed.build(trigger for _, trigger in reopened.iter_normal_triggers(after_id=resumed.load(path)))
+    reopened.close()
+
+    full = make_baseline()
+    full.build(events)
+    np.testing.assert_allclose(resumed.counts, full.counts)
+    assert resumed.stats()["events"] == len(events)
+    assert resumed.score(observation("20250430120500", "嘔吐", "臥室"))["reason"] == "未曾出現的行為或地點"
+
+
+def test_legacy_event_store_without_normal_column(tmp_path):
+    db_path = str(tmp_path / "events.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, time TEXT, trigger TEXT NOT NULL, "
+                 "action TEXT, effectiveness TEXT, created_at REAL)")
+    conn.execute("INSERT INTO events (trigger) VALUES (?)", ('{"time": "20250420120000", "action": "睡覺"}',))
+    conn.commit()
+    conn.close()
+
+    store = EventStore(db_path)
+    record(store, [observation("20250420120500")])
+
+    # 舊事件無法得知是否正常，不納入基準
+    assert [trigger["time"] for _, trigger in store.iter_normal_triggers()] == ["20250420120500"]
+    assert store.last_id() == 2
+    store.close()
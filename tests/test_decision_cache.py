@@ -0,0 +1,72 @@
+# tests/test_decision_cache.py
+
+from agent import decision_cache
+from agent.decision_cache import DecisionCache
+
+OBSERVATION = {"time": "20250429120500", "action": "吠叫", "地點": "門口"}
+TOOL_CALLS = [("check_current_state", {}), ("notify_owner", "狗狗在門口吠叫")]
+
+
+def put(cache, observation=OBSERVATION, state="一般", plan_version=1):
+    cache.put(observation, state, plan_version, TOOL_CALLS, "notify_owner(狗狗在門口吠叫)", "已通知飼主，完成")
+
+
+def test_hit_ignores_time_and_whitespace():
+    cache = DecisionCache(ttl=600)
+    assert cache.get(OBSERVATION, "一般", 1) is None
+    put(cache)
+
+    entry = cache.get({"time": "20250429121000", "action": " 吠叫 ", "地點": "門口"}, "一般", 1)
+
+    assert entry["tool_calls"] == TOOL_CALLS
+    assert entry["final_output"] == "已通知飼主，完成"
+    assert cache.stats()["hits"] == 1
+
+
+def test_state_or_plan_change_invalidates():
+    cache = DecisionCache(ttl=600)
+    cache.get(OBSERVATION, "一般", 1)
+    put(cache)
+
+    assert cache.get(OBSERVATION, "警戒", 1) is None
+    assert cache.get(OBSERVATION, "一般", 1) is None  # 切換狀態時已清空
+    put(cache)
+    assert cache.get(OBSERVATION, "一般", 2) is None
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_result_is_not_cached_when_context_changed_during_run():
+    cache = DecisionCache(ttl=600)
+    cache.get(OBSERVATION, "一般", 1)
+    # 推理期間 Agent 自己新增了計畫
+    put(cache, plan_version=2)
+
+    assert cache.get(OBSERVATION, "一般", 1) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_entry_is_dropped(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(decision_cache.time, "monotonic", lambda: now[0])
+    cache = DecisionCache(ttl=60)
+    cache.get(OBSERVATION, "一般", 1)
+    put(cache)
+
+    now[0] += 61
+
+    assert cache.get(OBSERVATION, "一般", 1) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = DecisionCache(ttl=600, max_entries=2)
+    observations = [dict(OBSERVATION, action=action) for action in ("吠叫", "睡覺", "喝水")]
+    cache.get(observations[0], "一般", 1)
+    put(cache, observations[0])
+    put(cache, observations[1])
+    cache.get(observations[0], "一般", 1)  # 最近使用過，保留
+    put(cache, observations[2])
+
+    assert cache.get(observations[0], "一般", 1) is not None
+    assert cache.get(observations[1], "一般", 1) is None
+    assert cache.get(observations[2], "一般", 1) is not None
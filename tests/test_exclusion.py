@@ -0,0 +1,78 @@
+# tests/test_exclusion.py
+
+import re
+
+import pytest
+
+from agent.exclusion import ExclusionMatcher
+
+
+def test_exact_match_ignores_whitespace_and_case():
+    matcher = ExclusionMatcher(["睡 覺", "Sleep"])
+
+    assert matcher.match("睡覺") == {"behavior": "睡覺", "type": "exact", "rule": "睡 覺"}
+    assert matcher.match(" SLEEP ")["rule"] == "Sleep"
+    assert matcher.match("吠叫") is None
+    assert matcher.match(None) is None
+
+
+def test_synonym_is_resolved_before_lookup():
+    matcher = ExclusionMatcher(["睡覺", "re:喝.*"], synonyms={"睡覺": ["打盹", "小睡"], "喝水": ["舔水"]})
+
+    assert matcher.match("打 盹") == {"behavior": "打 盹", "type": "synonym", "canonical": "睡覺", "rule": "睡覺"}
+    # 同義詞換成標準行為後再比對樣式
+    assert matcher.match("舔水") == {"behavior": "舔水", "type": "pattern", "rule": "re:喝.*", "canonical": "喝水"}
+
+    matcher.remove_synonyms("睡覺")
+    assert matcher.match("打盹") is None
+
+
+def test_patterns_match_the_normalized_behavior():
+    matcher = ExclusionMatcher(["*睡*", "re:play(ing)?ball"])
+
+    assert matcher.match("午睡中")["rule"] == "*睡*"
+    # re: 樣式比對的是去除空白並轉小寫後的文字，且需完整符合
+    assert matcher.match("Playing Ball")["rule"] == "re:play(ing)?ball"
+    assert matcher.match("playball outside") is None
+
+
+def test_patterns_are_added_and_removed_incrementally():
+    matcher = ExclusionMatcher(["*睡*"])
+    matcher.add("re:吃.*")
+    matcher.add("re:吃.*")
+    matcher.add("喝水")
+
+    assert matcher.stats() == {"exact": 1, "patterns": 2, "synonyms": 0}
+    assert matcher.match("吃飯")["rule"] == "re:吃.*"
+
+    matcher.remove("*睡*")
+    assert matcher.match("午睡") is None
+    assert matcher.match("吃飯")["rule"] == "re:吃.*"
+
+
+@pytest.mark.parametrize("pattern", ["re:(unclosed", "re:(?i)abc", "re:(?P<p0>x)"])
+def test_invalid_pattern_is_rejected_without_changing_the_list(pattern):
+    matcher = ExclusionMatcher(["*睡*"])
+
+    with pytest.raises(re.error):
+        matcher.add(pattern)
+
+    # 被拒絕的樣式不會留在清單中，之後仍可正常新增
+    assert matcher.stats()["patterns"] == 1
+    matcher.add("re:吃.*")
+    assert matcher.match("吃飯")["rule"] == "re:吃.*"
+    assert matcher.match("午睡")["rule"] == "*睡*"
+
+
+def test_invalid_pattern_in_saved_list_is_skipped():
+    matcher = ExclusionMatcher(["*睡*", "re:(?i)abc", "re:喝水"])
+
+    assert matcher.stats()["patterns"] == 2
+    assert matcher.match("喝水")["rule"] == "re:喝水"
+
+
+def test_pattern_with_own_groups_reports_the_right_rule():
+    matcher = ExclusionMatcher(["re:(a)(b)c", "re:(x)y"])
+
+    assert matcher.match("xy")["rule"] == "re:(x)y"
+    assert matcher.match("abc")["rule"] == "re:(a)(b)c"
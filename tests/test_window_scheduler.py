@@ -0,0 +1,149 @@
+# tests/test_window_scheduler.py
+
+import asyncio
+import json
+
+import pytest
+
+from agent.checkpoint import CheckpointStore
+from agent.log_tailer import LogTailer
+from agent.window_scheduler import WindowScheduler
+
+START = "20250429120000"
+
+
+def write_logs(path, times):
+    with open(path, "a", encoding="utf-8") as f:
+        for t in times:
+            f.write(json.dumps({"time": t, "action": "睡覺", "地點": "客廳"}, ensure_ascii=False) + "\n")
+
+
+def make_scheduler(tmp_path, checkpoint=None, max_attempts=2):
+    tailer = LogTailer(str(tmp_path / "log.jsonl"))
+    tailer.poll()
+    return WindowScheduler(tailer, start_time=START, window_minutes=5, checkpoint=checkpoint,
+                           max_attempts=max_attempts, retry_delay=0)
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    store = CheckpointStore(str(tmp_path / "checkpoint.db"))
+    yield store
+    store.close()
+
+
+def test_boundary_observation_belongs_to_one_window(tmp_path):
+    write_logs(tmp_path / "log.jsonl",
+               ["20250429120000", "20250429120300", "20250429120500", "20250429120800", "20250429121000"])
+    scheduler = make_scheduler(tmp_path)
+
+    windows = [(start, end, [log["time"] for log in logs]) for start, end, logs in scheduler.ready_windows()]
+
+    # 視窗為 (start, end]：起點 120000 不屬於第一個視窗，邊界 120500 只出現在第一個視窗
+    assert windows == [
+        ("20250429120000", "20250429120500", ["20250429120300", "20250429120500"]),
+        ("20250429120500", "20250429121000", ["20250429120800", "20250429121000"]),
+    ]
+
+
+def test_duplicate_observations_are_emitted_once(tmp_path, checkpoint):
+    write_logs(tmp_path / "log.jsonl", ["20250429120100", "20250429120100", "20250429120500"])
+    scheduler = make_scheduler(tmp_path, checkpoint)
+
+    (_, _, logs), = scheduler.ready_windows()
+
+    assert [log["time"] for log in logs] == ["20250429120100", "20250429120500"]
+    assert scheduler.duplicates == 1
+
+
+def test_resume_skips_processed_windows(tmp_path, checkpoint):
+    write_logs(tmp_path / "log.jsonl", ["20250429120300", "20250429120500", "20250429120800", "20250429121000"])
+    scheduler = make_scheduler(tmp_path, checkpoint)
+    windows = scheduler.ready_windows()
+    _, end, first = next(windows)
+    with scheduler.processing(first, end):
+        pass
+    # 第二個視窗已送出但尚未處理完時中斷
+    next(windows)
+
+    restarted = make_scheduler(tmp_path, checkpoint)
+    resumed = [(start, [log["time"] for log in logs]) for start, _, logs in restarted.ready_windows()]
+
+    assert checkpoint.get("resume_from") == "20250429120500"
+    assert resumed == [("20250429120500", ["20250429120800", "20250429121000"])]
+
+
+def test_resume_filters_processed_observations_in_partial_window(tmp_path, checkpoint):
+    write_logs(tmp_path / "log.jsonl", ["20250429120100", "20250429120300", "20250429120500"])
+    scheduler = make_scheduler(tmp_path, checkpoint)
+    (_, end, logs), = scheduler.ready_windows()
+    # 同一個視窗拆成兩批處理（例如不同寵物），只有第一批完成
+    with scheduler.processing(logs[:1], end):
+        pass
+
+    restarted = make_scheduler(tmp_path, checkpoint)
+    (_, _, resumed), = restarted.ready_windows()
+
+    assert [log["time"] for log in resumed] == ["20250429120300", "20250429120500"]
+    assert restarted.duplicates == 1
+
+
+def test_failed_window_is_retried_before_resume_point_advances(tmp_path, checkpoint):
+    write_logs(tmp_path / "log.jsonl", ["20250429120300", "20250429120500", "20250429120800"])
+    scheduler = make_scheduler(tmp_path, checkpoint)
+    (start, end, logs), = scheduler.ready_windows()
+
+    with pytest.raises(RuntimeError):
+        with scheduler.processing(logs, end):
+            raise RuntimeError("LLM 呼叫失敗")
+
+    # 重試前仍算處理中，重新啟動的起點停在失敗的視窗
+    assert scheduler.stats()["inflight_observations"] == 2
+    assert checkpoint.get("resume_from") == START
+    assert list(scheduler.ready_windows()) == [(start, end, logs)]
+
+    with scheduler.processing(logs, end):
+        pass
+    assert checkpoint.get("resume_from") == end
+    assert scheduler.stats()["inflight_observations"] == 0
+    assert scheduler.stats()["windows_retried"] == 1
+
+
+def test_failed_window_is_settled_as_unprocessed_after_max_attempts(tmp_path, checkpoint):
+    write_logs(tmp_path / "log.jsonl", ["20250429120300", "20250429120500", "20250429120800"])
+    scheduler = make_scheduler(tmp_path, checkpoint, max_attempts=2)
+    (_, end, logs), = scheduler.ready_windows()
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            with scheduler.processing(logs, end):
+                raise RuntimeError("LLM 呼叫失敗")
+        retried = list(scheduler.ready_windows())
+
+    # 重試次數用完：離開處理中清單，起點繼續推進，但不記為已處理
+    assert retried == []
+    assert scheduler.stats()["inflight_observations"] == 0
+    assert scheduler.stats()["windows_abandoned"] == 1
+    assert checkpoint.get("resume_from") == end
+    assert checkpoint.filter_unprocessed(logs) == logs
+
+
+def test_cancelled_window_is_processed_after_restart(tmp_path, checkpoint):
+    write_logs(tmp_path / "log.jsonl",
+               ["20250429120300", "20250429120500", "20250429120800", "20250429121000", "20250429121200"])
+    scheduler = make_scheduler(tmp_path, checkpoint)
+    windows = scheduler.ready_windows()
+    _, first_end, first = next(windows)
+    with scheduler.processing(first, first_end):
+        pass
+    _, second_end, second = next(windows)
+
+    # 關閉伺服器時取消執行中的視窗
+    with pytest.raises(asyncio.CancelledError):
+        with scheduler.processing(second, second_end):
+            raise asyncio.CancelledError()
+
+    assert checkpoint.get("resume_from") == first_end
+    restarted = make_scheduler(tmp_path, checkpoint)
+    resumed = [(end, [log["time"] for log in logs]) for _, end, logs in restarted.ready_windows()]
+    assert resumed == [(second_end, ["20250429120800", "20250429121000"])]